@@ -0,0 +1,157 @@
+from dataclasses import dataclass
+from typing import NamedTuple
+
+import numpy as np
+from django.db import connections, transaction
+from django.db.models import F, IntegerField, QuerySet, Value
+from django.db.models.functions import Cast, Coalesce, Round
+
+from components.models import AccountTransaction, CardTransaction, MonthlyRollup
+from components.rollups import ROLLUP_FIELDS
+
+LOAD_CHUNK_SIZE = 10000
+# id, day, spend and income cents, instrument id
+COLUMN_DTYPES = [np.int64, 'datetime64[D]', np.int64, np.int64, np.int64]
+# Instrument kinds in the frame, in the order of ROLLUP_FIELDS
+KINDS = list(ROLLUP_FIELDS)
+
+
+@dataclass
+class TransactionFrame:
+    """
+    Transactions as parallel NumPy columns, one element per transaction. Money is in integer cents, days count from
+    1970-01-01 and instrument is an index into instrument_kinds and instrument_ids (dictionary encoded), so
+    aggregations run as array operations instead of Decimal arithmetic on model instances.
+    """
+    kind: np.ndarray  # int8, index into KINDS
+    id: np.ndarray  # int64 transaction id
+    day: np.ndarray  # int32 days since the epoch
+    spend: np.ndarray  # int64 cents
+    income: np.ndarray  # int64 cents
+    instrument: np.ndarray  # int32 code
+    instrument_kinds: np.ndarray  # int8 kind per instrument code
+    instrument_ids: np.ndarray  # int64 account or card id per instrument code
+
+    def __len__(self):
+        return len(self.id)
+
+    @property
+    def net(self):
+        return self.income - self.spend
+
+    @property
+    def dates(self):
+        return self.day.astype('datetime64[D]')
+
+
+class MonthlyTotals(NamedTuple):
+    months: np.ndarray  # datetime64[M]
+    spend: np.ndarray  # int64 cents
+    income: np.ndarray  # int64 cents
+
+
+class InstrumentTotals(NamedTuple):
+    kinds: np.ndarray
+    ids: np.ndarray
+    spend: np.ndarray
+    income: np.ndarray
+
+
+def load_transaction_frame(account_transactions: QuerySet = None, card_transactions: QuerySet = None):
+    """
+    Load a selection of transactions into a TransactionFrame, all of them by default. Pass a filtered queryset per
+    model to narrow the selection, or .none() to leave a model out. Cents are computed by the database and only
+    plain integers and dates cross into Python. Transactions without a date are left out.
+    """
+    selections = {AccountTransaction: account_transactions, CardTransaction: card_transactions}
+    columns = {name: [] for name in ['kind', 'id', 'day', 'spend', 'income', 'instrument']}
+    for kind, transaction_model in enumerate(KINDS):
+        queryset = selections[transaction_model]
+        if queryset is None:
+            queryset = transaction_model.objects.all()
+        instrument_field, direction_fields = ROLLUP_FIELDS[transaction_model]
+        rows = (queryset
+                .filter(date__isnull=False)
+                .values_list('id', 'date',
+                             cents(direction_fields[MonthlyRollup.Direction.SPEND]),
+                             cents(direction_fields[MonthlyRollup.Direction.INCOME]),
+                             F(f'snapshot__instrument_statement__{instrument_field}_id')))
+        for name, array in zip(['id', 'day', 'spend', 'income', 'instrument'], load_columns(rows)):
+            columns[name].append(array)
+        columns['kind'].append(np.full(len(columns['id'][-1]), kind, dtype=np.int8))
+    columns = {name: np.concatenate(arrays) for name, arrays in columns.items()}
+    columns['day'] = columns['day'].astype(np.int32)
+
+    # Dictionary encode (kind, instrument id) pairs
+    instrument_keys, codes = np.unique(columns['instrument'] * len(KINDS) + columns['kind'], return_inverse=True)
+    columns['instrument'] = codes.astype(np.int32)
+    return TransactionFrame(**columns,
+                            instrument_kinds=(instrument_keys % len(KINDS)).astype(np.int8),
+                            instrument_ids=instrument_keys // len(KINDS))
+
+
+def load_columns(rows: QuerySet):
+    """
+    Read (id, date, spend, income, instrument) rows into one array per column, sized from a count of the rows and
+    filled a chunk at a time straight off the database cursor, so no Python object per row outlives its chunk.
+    """
+    filled = 0
+    if rows.query.is_empty():
+        # .none() has no SQL to run
+        arrays = [np.empty(0, dtype=dtype) for dtype in COLUMN_DTYPES]
+    else:
+        sql, params = rows.query.sql_with_params()
+        # The count and the rows are read in one transaction, so they agree
+        with transaction.atomic(using=rows.db), connections[rows.db].cursor() as cursor:
+            arrays = [np.empty(rows.count(), dtype=dtype) for dtype in COLUMN_DTYPES]
+            cursor.execute(sql, params)
+            while chunk := cursor.fetchmany(LOAD_CHUNK_SIZE):
+                # Dates come as date objects or ISO strings depending on the backend, datetime64 takes both
+                for array, values in zip(arrays, zip(*chunk)):
+                    array[filled:filled + len(chunk)] = values
+                filled += len(chunk)
+    return [array[:filled].view(np.int64) if array.dtype.kind == 'M' else array[:filled] for array in arrays]
+
+
+def cents(field: str):
+    return Coalesce(Cast(Round(F(field) * 100), IntegerField()), Value(0))
+
+
+def monthly_totals(frame: TransactionFrame) -> MonthlyTotals:
+    months, month_codes = np.unique(frame.dates.astype('datetime64[M]'), return_inverse=True)
+    return MonthlyTotals(months,
+                         sum_by(month_codes, frame.spend, len(months)),
+                         sum_by(month_codes, frame.income, len(months)))
+
+
+def instrument_totals(frame: TransactionFrame) -> InstrumentTotals:
+    count = len(frame.instrument_ids)
+    return InstrumentTotals(frame.instrument_kinds,
+                            frame.instrument_ids,
+                            sum_by(frame.instrument, frame.spend, count),
+                            sum_by(frame.instrument, frame.income, count))
+
+
+def running_balances(frame: TransactionFrame) -> np.ndarray:
+    """
+    The cumulative net (income less spend) of each transaction's instrument up to and including the transaction, in
+    date then id order, aligned with the rows of the frame.
+    """
+    order = np.lexsort((frame.id, frame.day, frame.instrument))
+    balances = np.cumsum(frame.net[order])
+    # Restart the sum at the first row of every instrument
+    instruments = frame.instrument[order]
+    starts = np.flatnonzero(np.diff(instruments)) + 1
+    offsets = np.zeros(len(frame), dtype=np.int64)
+    offsets[starts] = np.diff(np.concatenate(([0], balances[starts - 1])))
+    balances -= np.cumsum(offsets)
+    result = np.empty_like(balances)
+    result[order] = balances
+    return result
+
+
+def sum_by(codes: np.ndarray, values: np.ndarray, count: int) -> np.ndarray:
+    # np.add.at keeps int64 cents exact where bincount would go through float64
+    sums = np.zeros(count, dtype=np.int64)
+    np.add.at(sums, codes, values)
+    return sums
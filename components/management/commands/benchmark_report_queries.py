@@ -0,0 +1,205 @@
+import datetime
+import random
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+from components.models import Account, \
+    AccountSnapshot, \
+    AccountTransaction, \
+    Card, \
+    CardSnapshot, \
+    CardTransaction, \
+    FinancialInstitution, \
+    InstrumentHolder, \
+    InstrumentStatement, \
+    Statement
+
+BENCHMARK_DATABASE = 'benchmark'
+INSERT_BATCH_SIZE = 10000
+INSTRUMENTS_PER_TYPE = 5
+STATEMENT_MONTHS = 60
+REPORT_INDEXES = [(Statement, ['statement_date_type_idx']),
+                  (AccountTransaction, ['account_txn_snapshot_date_idx', 'account_txn_date_amount_idx']),
+                  (CardTransaction, ['card_txn_snapshot_date_idx',
+                                     'card_txn_date_amount_idx',
+                                     'card_txn_post_date_idx'])]
+
+
+class Command(BaseCommand):
+    help = ('Time the reporting queries and print their query plans with and without the reporting indexes, on a '
+            'separate generated database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', type=Path, default=settings.BASE_DIR / 'cache' / 'benchmark.sqlite3',
+                            help='Benchmark database file, generated when it does not exist')
+        parser.add_argument('--transactions', type=int, default=1_000_000,
+                            help='Number of transactions to generate, split evenly between accounts and cards')
+        parser.add_argument('--regenerate', action='store_true', help='Regenerate an existing benchmark database')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query, the fastest is reported')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if options['regenerate'] and path.exists():
+            path.unlink()
+        generate = not path.exists()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        connections.settings[BENCHMARK_DATABASE] = connections.settings['default'] | {'NAME': path}
+        call_command('migrate', database=BENCHMARK_DATABASE, verbosity=0)
+        if generate:
+            start = time.perf_counter()
+            with transaction.atomic(using=BENCHMARK_DATABASE):
+                generate_transactions(options['transactions'])
+            self.stdout.write(f'Generated {options["transactions"]} transactions in '
+                              f'{time.perf_counter() - start:.1f}s')
+
+        queries = report_queries()
+        self.set_report_indexes(False)
+        before = {name: self.measure(query, options['repeat']) for name, query in queries.items()}
+        self.set_report_indexes(True)
+        after = {name: self.measure(query, options['repeat']) for name, query in queries.items()}
+
+        for name in queries:
+            (before_plan, before_time), (after_plan, after_time) = before[name], after[name]
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(f'  without indexes {before_time * 1000:10.1f} ms')
+            self.stdout.write('\n'.join(f'    {line}' for line in before_plan.splitlines()))
+            self.stdout.write(f'  with indexes    {after_time * 1000:10.1f} ms '
+                              f'({before_time / after_time if after_time else float("inf"):.1f}x)')
+            self.stdout.write('\n'.join(f'    {line}' for line in after_plan.splitlines()))
+
+    def set_report_indexes(self, enabled: bool):
+        connection = connections[BENCHMARK_DATABASE]
+        existing = {index for model, names in REPORT_INDEXES
+                    for index in connection.introspection.get_constraints(connection.cursor(), model._meta.db_table)}
+        with connection.schema_editor() as schema_editor:
+            for model, names in REPORT_INDEXES:
+                for index in model._meta.indexes:
+                    if index.name not in names:
+                        continue
+                    if enabled and index.name not in existing:
+                        schema_editor.add_index(model, index)
+                    elif not enabled and index.name in existing:
+                        schema_editor.remove_index(model, index)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    @staticmethod
+    def measure(query, repeat: int):
+        queryset, evaluate = query
+        plan = queryset.explain()
+        fastest = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            evaluate(queryset.all())
+            elapsed = time.perf_counter() - start
+            fastest = elapsed if fastest is None else min(fastest, elapsed)
+        return plan, fastest
+
+
+def report_queries():
+    """
+    The access paths of the monthly reports: one instrument over a date range, totals per month over a date range and
+    statements over a date range, each sorted by date.
+    """
+    transactions = AccountTransaction.objects.using(BENCHMARK_DATABASE)
+    card_transactions = CardTransaction.objects.using(BENCHMARK_DATABASE)
+    account = Account.objects.using(BENCHMARK_DATABASE).order_by('pk').first()
+    card = Card.objects.using(BENCHMARK_DATABASE).order_by('pk').first()
+    year = (datetime.date(2023, 1, 1), datetime.date(2023, 12, 31))
+    month = (datetime.date(2023, 6, 1), datetime.date(2023, 6, 30))
+    return {
+        'Account transactions for one account in a year':
+            (transactions
+             .filter(snapshot__instrument_statement__account=account, date__range=year)
+             .order_by('date'), list),
+        'Account totals per month in a year':
+            (transactions
+             .filter(date__range=year)
+             .annotate(month=TruncMonth('date'))
+             .values('month')
+             .annotate(withdrawals=Sum('amount'), deposits=Sum('deposits'))
+             .order_by('month'), list),
+        'Card spend for one card in a month':
+            (card_transactions
+             .filter(snapshot__instrument_statement__card=card, date__range=month), lambda queryset:
+             queryset.aggregate(total=Sum('amount'))),
+        'Card transactions posted in a month':
+            (card_transactions
+             .filter(post_date__range=month)
+             .order_by('post_date'), list),
+        'Statements in a year':
+            (Statement.objects
+             .using(BENCHMARK_DATABASE)
+             .filter(date__range=year)
+             .order_by('date'), list)
+    }
+
+
+def generate_transactions(count: int):
+    """
+    Fill the benchmark database with monthly statements for a few accounts and cards and spread count transactions
+    evenly over their snapshots.
+    """
+    db = BENCHMARK_DATABASE
+    rng = random.Random(0)
+    fi = FinancialInstitution.objects.using(db).create(full_name='Benchmark Bank', abbreviation='BB')
+    holder = InstrumentHolder.objects.using(db).create(full_name='Benchmark Holder')
+    accounts = [Account.objects.using(db).create(holder=holder, provider=fi, name='Savings', number=str(i))
+                for i in range(INSTRUMENTS_PER_TYPE)]
+    cards = [Card.objects.using(db).create(holder=holder, provider=fi, name='Rewards', number=str(i),
+                                           name_on_card='Benchmark Holder')
+             for i in range(INSTRUMENTS_PER_TYPE)]
+
+    account_snapshots = []
+    card_snapshots = []
+    for month in range(STATEMENT_MONTHS):
+        statement_date = datetime.date(2020 + month // 12, month % 12 + 1, 28)
+        for statement_type, instruments, snapshots in [(Statement.InstrumentType.ACCOUNT, accounts, account_snapshots),
+                                                       (Statement.InstrumentType.CARD, cards, card_snapshots)]:
+            statement = Statement.objects.using(db).create(holder=holder, provider=fi, date=statement_date,
+                                                           type=statement_type,
+                                                           file_name=f'{statement_type}-{statement_date}')
+            for instrument in instruments:
+                if statement_type == Statement.InstrumentType.ACCOUNT:
+                    instrument_statement = InstrumentStatement.objects.using(db).create(statement=statement,
+                                                                                        account=instrument)
+                    snapshot = AccountSnapshot.objects.using(db).create(instrument_statement=instrument_statement,
+                                                                        balance=Decimal('1000.00'))
+                else:
+                    instrument_statement = InstrumentStatement.objects.using(db).create(statement=statement,
+                                                                                        card=instrument)
+                    snapshot = CardSnapshot.objects.using(db).create(instrument_statement=instrument_statement,
+                                                                     total_credit_limit=10000)
+                snapshots.append((snapshot, statement_date))
+
+    for transaction_model, snapshots in [(AccountTransaction, account_snapshots), (CardTransaction, card_snapshots)]:
+        per_snapshot = count // 2 // len(snapshots)
+        batch = []
+        for snapshot, statement_date in snapshots:
+            for row_number in range(1, per_snapshot + 1):
+                date = statement_date - datetime.timedelta(days=rng.randrange(28))
+                fields = {
+                    'snapshot': snapshot,
+                    'row_number': row_number,
+                    'date': date,
+                    'description': f'Merchant {rng.randrange(500)}',
+                    'sub_description': '',
+                    'amount': Decimal(rng.randrange(1, 100000)) / 100
+                }
+                if transaction_model is AccountTransaction:
+                    fields['deposits'] = Decimal(rng.randrange(1, 100000)) / 100 if rng.random() < 0.2 else None
+                else:
+                    fields['post_date'] = date + datetime.timedelta(days=rng.randrange(3))
+                batch.append(transaction_model(**fields))
+                if len(batch) == INSERT_BATCH_SIZE:
+                    transaction_model.objects.using(db).bulk_create(batch)
+                    batch = []
+        transaction_model.objects.using(db).bulk_create(batch)
@@ -0,0 +1,111 @@
+import csv
+import datetime
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F, Value
+
+from components.models import AccountTransaction, CardTransaction
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_COLUMNS = ['kind', 'id', 'date', 'post_date', 'description', 'sub_description', 'amount', 'deposits',
+                  'balance', 'cash_rebate', 'currency', 'instrument_name', 'instrument_number', 'holder', 'provider',
+                  'statement_date', 'statement_file']
+# Columns only one of the transaction models has
+KIND_COLUMNS = {
+    'account': (AccountTransaction, ['deposits', 'balance']),
+    'card': (CardTransaction, ['post_date', 'cash_rebate'])
+}
+
+
+class Command(BaseCommand):
+    help = ('Export account and card transactions with their instrument, holder, provider and statement to CSV or '
+            'Parquet. Rows are streamed, so memory use does not grow with the export.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', type=Path)
+        parser.add_argument('--format', choices=['csv', 'parquet'],
+                            help='Output format (default: from the output file extension)')
+        parser.add_argument('--date-from', type=datetime.date.fromisoformat)
+        parser.add_argument('--date-to', type=datetime.date.fromisoformat)
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE,
+                            help='Rows fetched from the database, and written per Parquet row group, at a time')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        output_format = options['format'] or output.suffix.lstrip('.').casefold()
+        if output_format not in ('csv', 'parquet'):
+            raise CommandError(f'Cannot tell the format of {output}, use --format')
+
+        rows = export_rows(options['date_from'], options['date_to'], options['chunk_size'])
+        if output_format == 'csv':
+            count = write_csv(output, rows)
+        else:
+            count = write_parquet(output, rows, options['chunk_size'])
+        self.stdout.write(f'Exported {count} transactions to {output}')
+
+
+def export_rows(date_from: datetime.date, date_to: datetime.date, chunk_size: int):
+    """
+    Yield one dict per transaction, account transactions first, each kind ordered by date. Columns of the other kind
+    are left out of the dict and written empty.
+    """
+    for kind, (transaction_model, kind_fields) in KIND_COLUMNS.items():
+        instrument = f'snapshot__instrument_statement__{kind}'
+        queryset = transaction_model.objects.all()
+        if date_from:
+            queryset = queryset.filter(date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(date__lte=date_to)
+        rows = (queryset
+                .order_by('date', 'pk')
+                .values('id', 'date', 'description', 'sub_description', 'amount', *kind_fields,
+                        kind=Value(kind),
+                        currency=F(f'{instrument}__currency'),
+                        instrument_name=F(f'{instrument}__name'),
+                        instrument_number=F(f'{instrument}__number'),
+                        holder=F(f'{instrument}__holder__full_name'),
+                        provider=F(f'{instrument}__provider__abbreviation'),
+                        statement_date=F('snapshot__instrument_statement__statement__date'),
+                        statement_file=F('snapshot__instrument_statement__statement__file_name')))
+        yield from rows.iterator(chunk_size=chunk_size)
+
+
+def write_csv(output: Path, rows):
+    count = 0
+    with open(output, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=EXPORT_COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def write_parquet(output: Path, rows, row_group_size: int):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise CommandError('Parquet export needs pyarrow, install it or export to CSV')
+
+    money = pa.decimal128(20, 2)
+    schema = pa.schema([('kind', pa.string()), ('id', pa.int64()), ('date', pa.date32()), ('post_date', pa.date32()),
+                        ('description', pa.string()), ('sub_description', pa.string()), ('amount', money),
+                        ('deposits', money), ('balance', money), ('cash_rebate', money), ('currency', pa.string()),
+                        ('instrument_name', pa.string()), ('instrument_number', pa.string()), ('holder', pa.string()),
+                        ('provider', pa.string()), ('statement_date', pa.date32()), ('statement_file', pa.string())])
+    count = 0
+    with pq.ParquetWriter(output, schema) as writer:
+        # One row group per chunk, so at most one chunk is held in memory
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == row_group_size:
+                writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+                count += len(chunk)
+                chunk = []
+        if chunk:
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+            count += len(chunk)
+    return count
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from components.models import MonthlyRollup
+from components.rollups import rebuild_monthly_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the monthly rollups from all account and card transactions.'
+
+    def handle(self, *args, **options):
+        rebuild_monthly_rollups()
+        self.stdout.write(f'Rebuilt {MonthlyRollup.objects.count()} monthly rollups')
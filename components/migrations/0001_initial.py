@@ -0,0 +1,206 @@
+# Generated by Django 5.0.6 on 2026-10-17 17:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Address',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('full_address', models.CharField(max_length=255, unique=True)),
+            ],
+            options={
+                'db_table': 'project_address',
+            },
+        ),
+        migrations.CreateModel(
+            name='AccountTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(null=True, verbose_name='transaction date')),
+                ('description', models.CharField(max_length=255)),
+                ('sub_description', models.CharField(max_length=500)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=20, null=True)),
+                ('row_number', models.IntegerField(verbose_name='row number in corresponding table in statement')),
+                ('snapshot_id', models.PositiveIntegerField()),
+                ('deposits', models.DecimalField(decimal_places=2, max_digits=20, null=True)),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=20, null=True)),
+                ('snapshot_content_type', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='contenttypes.contenttype')),
+            ],
+            options={
+                'db_table': 'project_account_transaction',
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='CardTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(null=True, verbose_name='transaction date')),
+                ('description', models.CharField(max_length=255)),
+                ('sub_description', models.CharField(max_length=500)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=20, null=True)),
+                ('row_number', models.IntegerField(verbose_name='row number in corresponding table in statement')),
+                ('snapshot_id', models.PositiveIntegerField()),
+                ('post_date', models.DateField(null=True, verbose_name='post date')),
+                ('cash_rebate', models.DecimalField(decimal_places=2, max_digits=20, null=True)),
+                ('snapshot_content_type', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='contenttypes.contenttype')),
+            ],
+            options={
+                'db_table': 'project_card_transaction',
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='FinancialInstitution',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('full_name', models.CharField(max_length=255, null=True)),
+                ('abbreviation', models.CharField(max_length=5)),
+                ('company_registration_number', models.CharField(max_length=20, null=True)),
+                ('gst_registration_number', models.CharField(max_length=20, null=True)),
+                ('website', models.CharField(max_length=255, null=True)),
+                ('address', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='components.address')),
+            ],
+            options={
+                'db_table': 'project_financial_institution',
+            },
+        ),
+        migrations.CreateModel(
+            name='InstrumentHolder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('full_name', models.CharField(max_length=255)),
+                ('address', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='components.address')),
+            ],
+            options={
+                'db_table': 'project_instrument_holder',
+            },
+        ),
+        migrations.CreateModel(
+            name='Card',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('number', models.CharField(max_length=20)),
+                ('currency', models.CharField(max_length=3, null=True)),
+                ('name_on_card', models.CharField(max_length=255)),
+                ('parent', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='components.card')),
+                ('provider', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='components.financialinstitution')),
+                ('holder', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='components.instrumentholder')),
+            ],
+            options={
+                'db_table': 'project_card',
+            },
+        ),
+        migrations.CreateModel(
+            name='Account',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('number', models.CharField(max_length=20)),
+                ('currency', models.CharField(max_length=3, null=True)),
+                ('type', models.CharField(max_length=10, null=True)),
+                ('provider', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='components.financialinstitution')),
+                ('holder', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='components.instrumentholder')),
+            ],
+            options={
+                'db_table': 'project_account',
+            },
+        ),
+        migrations.CreateModel(
+            name='InstrumentStatement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('instrument_id', models.PositiveIntegerField()),
+                ('instrument_content_type', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='contenttypes.contenttype')),
+            ],
+            options={
+                'db_table': 'project_instrument_statement',
+            },
+        ),
+        migrations.CreateModel(
+            name='CardSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_credit_limit', models.PositiveIntegerField(verbose_name='total credit limit')),
+                ('instrument_statement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='components.instrumentstatement')),
+            ],
+            options={
+                'db_table': 'project_card_snapshot',
+            },
+        ),
+        migrations.CreateModel(
+            name='AccountSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('credit_line', models.DecimalField(decimal_places=2, max_digits=20, null=True)),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('instrument_statement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='components.instrumentstatement')),
+            ],
+            options={
+                'db_table': 'project_account_snapshot',
+            },
+        ),
+        migrations.CreateModel(
+            name='Statement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_name', models.CharField(max_length=255, unique=True)),
+                ('date', models.DateField(verbose_name='statement date')),
+                ('type', models.CharField(choices=[('ACCOUNT', 'Account'), ('CARD', 'Card')], max_length=10)),
+                ('holder', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='components.instrumentholder')),
+                ('provider', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='components.financialinstitution')),
+            ],
+            options={
+                'db_table': 'project_statement',
+            },
+        ),
+        migrations.AddField(
+            model_name='instrumentstatement',
+            name='statement',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='components.statement'),
+        ),
+        migrations.AddConstraint(
+            model_name='accounttransaction',
+            constraint=models.UniqueConstraint(fields=('snapshot_content_type', 'snapshot_id', 'row_number'), name='unique_accounttransaction'),
+        ),
+        migrations.AddConstraint(
+            model_name='cardtransaction',
+            constraint=models.UniqueConstraint(fields=('snapshot_content_type', 'snapshot_id', 'row_number'), name='unique_cardtransaction'),
+        ),
+        migrations.AddConstraint(
+            model_name='financialinstitution',
+            constraint=models.UniqueConstraint(fields=('full_name', 'abbreviation'), name='unique_financial_institution'),
+        ),
+        migrations.AddConstraint(
+            model_name='instrumentholder',
+            constraint=models.UniqueConstraint(fields=('full_name', 'address'), name='unique_instrument_holder'),
+        ),
+        migrations.AddConstraint(
+            model_name='card',
+            constraint=models.UniqueConstraint(fields=('holder', 'provider', 'name', 'name_on_card', 'number', 'currency'), name='unique_card'),
+        ),
+        migrations.AddConstraint(
+            model_name='account',
+            constraint=models.UniqueConstraint(fields=('holder', 'provider', 'name', 'number'), name='unique_account'),
+        ),
+        migrations.AddConstraint(
+            model_name='statement',
+            constraint=models.UniqueConstraint(fields=('holder', 'provider', 'date', 'type'), name='unique_statement'),
+        ),
+        migrations.AddConstraint(
+            model_name='instrumentstatement',
+            constraint=models.UniqueConstraint(fields=('instrument_content_type', 'instrument_id', 'statement'), name='unique_instrument_statement'),
+        ),
+    ]
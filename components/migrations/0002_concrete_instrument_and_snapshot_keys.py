@@ -0,0 +1,205 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+# Ids of unmappable rows listed per table before the rest are only counted
+UNMAPPABLE_IDS_SHOWN = 20
+
+
+def copy_generic_keys(apps, schema_editor):
+    """
+    Copy each generic key whose content type is the expected model and whose row exists. Any other row would be left
+    with no concrete key, so the migration stops and lists them instead.
+    """
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    InstrumentStatement = apps.get_model('components', 'InstrumentStatement')
+    AccountTransaction = apps.get_model('components', 'AccountTransaction')
+    CardTransaction = apps.get_model('components', 'CardTransaction')
+    db = schema_editor.connection.alias
+
+    unmappable = {}
+    for field in ['account', 'card']:
+        content_type = ContentType.objects.using(db).filter(app_label='components', model=field).first()
+        if content_type is not None:
+            instrument_ids = apps.get_model('components', field).objects.using(db).values('pk')
+            (InstrumentStatement.objects.using(db)
+             .filter(instrument_content_type=content_type, instrument_id__in=instrument_ids)
+             .update(**{field: F('instrument_id')}))
+    unmappable[InstrumentStatement] = (InstrumentStatement.objects.using(db)
+                                       .filter(account__isnull=True, card__isnull=True))
+    for transaction_model, snapshot_model_name in [(AccountTransaction, 'accountsnapshot'),
+                                                   (CardTransaction, 'cardsnapshot')]:
+        content_type = ContentType.objects.using(db).filter(app_label='components', model=snapshot_model_name).first()
+        if content_type is not None:
+            snapshot_ids = apps.get_model('components', snapshot_model_name).objects.using(db).values('pk')
+            (transaction_model.objects.using(db)
+             .filter(snapshot_content_type=content_type, snapshot_id__in=snapshot_ids)
+             .update(snapshot_ref=F('snapshot_id')))
+        unmappable[transaction_model] = transaction_model.objects.using(db).filter(snapshot_ref__isnull=True)
+
+    errors = []
+    for model, rows in unmappable.items():
+        ids = list(rows.order_by('pk').values_list('pk', flat=True))
+        if ids:
+            shown = ', '.join(str(pk) for pk in ids[:UNMAPPABLE_IDS_SHOWN])
+            more = f' and {len(ids) - UNMAPPABLE_IDS_SHOWN} more' if len(ids) > UNMAPPABLE_IDS_SHOWN else ''
+            errors.append(f'{model._meta.db_table} ids {shown}{more}')
+    if errors:
+        raise ValueError('Rows whose generic key has no content type, an unknown content type or a missing target '
+                         'cannot be given a concrete key. Fix or delete them and migrate again: ' + '; '.join(errors))
+
+
+def restore_generic_keys(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    InstrumentStatement = apps.get_model('components', 'InstrumentStatement')
+    AccountTransaction = apps.get_model('components', 'AccountTransaction')
+    CardTransaction = apps.get_model('components', 'CardTransaction')
+    db = schema_editor.connection.alias
+
+    for field in ['account', 'card']:
+        content_type, created = ContentType.objects.using(db).get_or_create(app_label='components', model=field)
+        (InstrumentStatement.objects.using(db)
+         .filter(**{f'{field}__isnull': False})
+         .update(instrument_content_type=content_type, instrument_id=F(f'{field}_id')))
+    for transaction_model, model_name in [(AccountTransaction, 'accountsnapshot'), (CardTransaction, 'cardsnapshot')]:
+        content_type, created = ContentType.objects.using(db).get_or_create(app_label='components', model=model_name)
+        (transaction_model.objects.using(db)
+         .update(snapshot_content_type=content_type, snapshot_id=F('snapshot_ref_id')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('components', '0001_initial'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        # Generic keys become nullable so a reversal can add them back to populated tables
+        migrations.AlterField(
+            model_name='instrumentstatement',
+            name='instrument_id',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='accounttransaction',
+            name='snapshot_id',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='cardtransaction',
+            name='snapshot_id',
+            field=models.PositiveIntegerField(null=True),
+        ),
+
+        # Concrete keys next to the generic ones
+        migrations.AddField(
+            model_name='instrumentstatement',
+            name='account',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='components.account'),
+        ),
+        migrations.AddField(
+            model_name='instrumentstatement',
+            name='card',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='components.card'),
+        ),
+        migrations.AddField(
+            model_name='accounttransaction',
+            name='snapshot_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE,
+                                    to='components.accountsnapshot'),
+        ),
+        migrations.AddField(
+            model_name='cardtransaction',
+            name='snapshot_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE,
+                                    to='components.cardsnapshot'),
+        ),
+        migrations.RunPython(copy_generic_keys, restore_generic_keys),
+
+        # Drop the generic keys
+        migrations.RemoveConstraint(
+            model_name='instrumentstatement',
+            name='unique_instrument_statement',
+        ),
+        migrations.RemoveConstraint(
+            model_name='accounttransaction',
+            name='unique_accounttransaction',
+        ),
+        migrations.RemoveConstraint(
+            model_name='cardtransaction',
+            name='unique_cardtransaction',
+        ),
+        migrations.RemoveField(
+            model_name='instrumentstatement',
+            name='instrument_content_type',
+        ),
+        migrations.RemoveField(
+            model_name='instrumentstatement',
+            name='instrument_id',
+        ),
+        migrations.RemoveField(
+            model_name='accounttransaction',
+            name='snapshot_content_type',
+        ),
+        migrations.RemoveField(
+            model_name='accounttransaction',
+            name='snapshot_id',
+        ),
+        migrations.RemoveField(
+            model_name='cardtransaction',
+            name='snapshot_content_type',
+        ),
+        migrations.RemoveField(
+            model_name='cardtransaction',
+            name='snapshot_id',
+        ),
+
+        # The concrete keys take over the generic keys' names
+        migrations.RenameField(
+            model_name='accounttransaction',
+            old_name='snapshot_ref',
+            new_name='snapshot',
+        ),
+        migrations.RenameField(
+            model_name='cardtransaction',
+            old_name='snapshot_ref',
+            new_name='snapshot',
+        ),
+        migrations.AlterField(
+            model_name='accounttransaction',
+            name='snapshot',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='components.accountsnapshot'),
+        ),
+        migrations.AlterField(
+            model_name='cardtransaction',
+            name='snapshot',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='components.cardsnapshot'),
+        ),
+        migrations.AddConstraint(
+            model_name='instrumentstatement',
+            constraint=models.UniqueConstraint(fields=('account', 'statement'), name='unique_account_statement'),
+        ),
+        migrations.AddConstraint(
+            model_name='instrumentstatement',
+            constraint=models.UniqueConstraint(fields=('card', 'statement'), name='unique_card_statement'),
+        ),
+        migrations.AddConstraint(
+            model_name='instrumentstatement',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('account__isnull', False),
+                                                                      ('card__isnull', True)),
+                                                             models.Q(('account__isnull', True),
+                                                                      ('card__isnull', False)),
+                                                             _connector='OR'),
+                                              name='instrument_statement_one_instrument'),
+        ),
+        migrations.AddConstraint(
+            model_name='accounttransaction',
+            constraint=models.UniqueConstraint(fields=('snapshot', 'row_number'), name='unique_accounttransaction'),
+        ),
+        migrations.AddConstraint(
+            model_name='cardtransaction',
+            constraint=models.UniqueConstraint(fields=('snapshot', 'row_number'), name='unique_cardtransaction'),
+        ),
+    ]
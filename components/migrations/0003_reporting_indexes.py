@@ -0,0 +1,48 @@
+# Generated by Django 5.0.6 on 2026-10-17 17:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('components', '0002_concrete_instrument_and_snapshot_keys'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='accounttransaction',
+            name='snapshot',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='components.accountsnapshot'),
+        ),
+        migrations.AlterField(
+            model_name='cardtransaction',
+            name='snapshot',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='components.cardsnapshot'),
+        ),
+        migrations.AddIndex(
+            model_name='accounttransaction',
+            index=models.Index(fields=['snapshot', 'date'], name='account_txn_snapshot_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accounttransaction',
+            index=models.Index(fields=['date', 'amount', 'deposits'], name='account_txn_date_amount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cardtransaction',
+            index=models.Index(fields=['snapshot', 'date'], name='card_txn_snapshot_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cardtransaction',
+            index=models.Index(fields=['date', 'amount'], name='card_txn_date_amount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cardtransaction',
+            index=models.Index(fields=['post_date'], name='card_txn_post_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='statement',
+            index=models.Index(fields=['date', 'type'], name='statement_date_type_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.6 on 2026-10-17 17:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('components', '0003_reporting_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='first day of the month')),
+                ('direction', models.CharField(choices=[('SPEND', 'Spend'), ('INCOME', 'Income')], max_length=10)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('transaction_count', models.PositiveIntegerField(default=0)),
+                ('account', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='components.account')),
+                ('card', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='components.card')),
+            ],
+            options={
+                'db_table': 'project_monthly_rollup',
+                'indexes': [models.Index(fields=['month', 'direction'], name='monthly_rollup_month_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='monthlyrollup',
+            constraint=models.UniqueConstraint(fields=('account', 'month', 'direction'), name='unique_account_monthly_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='monthlyrollup',
+            constraint=models.UniqueConstraint(fields=('card', 'month', 'direction'), name='unique_card_monthly_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='monthlyrollup',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('account__isnull', False), ('card__isnull', True)), models.Q(('account__isnull', True), ('card__isnull', False)), _connector='OR'), name='monthly_rollup_one_instrument'),
+        ),
+    ]
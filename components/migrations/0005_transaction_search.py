@@ -0,0 +1,50 @@
+from django.db import migrations
+
+# Account transactions take even rowids and card transactions odd ones, so both tables share one index and every
+# trigger finds its entry by rowid
+SEARCH_TABLES = [('project_account_transaction', 0), ('project_card_transaction', 1)]
+
+CREATE_SEARCH_TABLE = """
+CREATE VIRTUAL TABLE project_transaction_search USING fts5(
+    description,
+    sub_description,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '3'
+)
+"""
+
+CREATE_TRIGGERS = """
+CREATE TRIGGER {table}_search_insert AFTER INSERT ON {table} BEGIN
+    INSERT INTO project_transaction_search (rowid, description, sub_description)
+    VALUES (new.id * 2 + {kind}, new.description, new.sub_description);
+END;
+CREATE TRIGGER {table}_search_update AFTER UPDATE OF description, sub_description ON {table} BEGIN
+    DELETE FROM project_transaction_search WHERE rowid = old.id * 2 + {kind};
+    INSERT INTO project_transaction_search (rowid, description, sub_description)
+    VALUES (new.id * 2 + {kind}, new.description, new.sub_description);
+END;
+CREATE TRIGGER {table}_search_delete AFTER DELETE ON {table} BEGIN
+    DELETE FROM project_transaction_search WHERE rowid = old.id * 2 + {kind};
+END;
+INSERT INTO project_transaction_search (rowid, description, sub_description)
+SELECT id * 2 + {kind}, description, sub_description FROM {table};
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER {table}_search_insert;
+DROP TRIGGER {table}_search_update;
+DROP TRIGGER {table}_search_delete;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('components', '0004_monthlyrollup'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_SEARCH_TABLE, 'DROP TABLE project_transaction_search'),
+        *[migrations.RunSQL(CREATE_TRIGGERS.format(table=table, kind=kind), DROP_TRIGGERS.format(table=table))
+          for table, kind in SEARCH_TABLES],
+    ]
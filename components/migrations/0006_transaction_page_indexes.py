@@ -0,0 +1,21 @@
+# Generated by Django 5.0.6 on 2026-10-17 18:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('components', '0005_transaction_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='accounttransaction',
+            index=models.Index(fields=['-date', '-id'], name='account_txn_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cardtransaction',
+            index=models.Index(fields=['-date', '-id'], name='card_txn_date_id_idx'),
+        ),
+    ]
@@ -1,5 +1,3 @@
-from django.contrib.contenttypes.fields import GenericForeignKey
-from django.contrib.contenttypes.models import ContentType
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
@@ -61,19 +59,29 @@ class Statement(LoggableModel):
         constraints = [
             models.UniqueConstraint(name='unique_statement', fields=['holder', 'provider', 'date', 'type'])
         ]
+        indexes = [
+            models.Index(name='statement_date_type_idx', fields=['date', 'type'])
+        ]
 
 
 class InstrumentStatement(LoggableModel):
     statement = models.ForeignKey(Statement, on_delete=models.CASCADE)
-    instrument_content_type = models.ForeignKey(ContentType, null=True, on_delete=models.SET_NULL)
-    instrument_id = models.PositiveIntegerField()
-    instrument = GenericForeignKey('instrument_content_type', 'instrument_id')
+    # Exactly one of account and card is set
+    account = models.ForeignKey('Account', null=True, on_delete=models.CASCADE)
+    card = models.ForeignKey('Card', null=True, on_delete=models.CASCADE)
+
+    @property
+    def instrument(self):
+        return self.account if self.account_id is not None else self.card
 
     class Meta:
         db_table = 'project_instrument_statement'
         constraints = [
-            models.UniqueConstraint(name='unique_instrument_statement',
-                                    fields=['instrument_content_type', 'instrument_id', 'statement'])
+            models.UniqueConstraint(name='unique_account_statement', fields=['account', 'statement']),
+            models.UniqueConstraint(name='unique_card_statement', fields=['card', 'statement']),
+            models.CheckConstraint(name='instrument_statement_one_instrument',
+                                   check=(models.Q(account__isnull=False, card__isnull=True) |
+                                          models.Q(account__isnull=True, card__isnull=False)))
         ]
 
 
@@ -139,31 +147,76 @@ class Transaction(LoggableModel):
     sub_description = models.CharField(max_length=500)
     amount = models.DecimalField(max_digits=20, decimal_places=2, null=True)
     row_number = models.IntegerField('row number in corresponding table in statement')
-    snapshot_content_type = models.ForeignKey(ContentType, null=True, on_delete=models.SET_NULL)
-    snapshot_id = models.PositiveIntegerField()
-    snapshot = GenericForeignKey('snapshot_content_type', 'snapshot_id')
 
     class Meta:
         abstract = True
         constraints = [
-            models.UniqueConstraint(name='unique_%(class)',
-                                    fields=['snapshot_content_type', 'snapshot_id', 'row_number'])
+            models.UniqueConstraint(name='unique_%(class)s',
+                                    fields=['snapshot', 'row_number'])
         ]
 
 
 class AccountTransaction(Transaction):
+    # Indexed through the composite indexes that lead with it
+    snapshot = models.ForeignKey(AccountSnapshot, db_index=False, on_delete=models.CASCADE)
     # withdrawals are considered transaction amounts
     deposits = models.DecimalField(max_digits=20, decimal_places=2, null=True)
     balance = models.DecimalField(max_digits=20, decimal_places=2, null=True)
 
-    class Meta:
+    class Meta(Transaction.Meta):
         db_table = 'project_account_transaction'
+        indexes = [
+            # Instrument and date range, ordered by date
+            models.Index(name='account_txn_snapshot_date_idx', fields=['snapshot', 'date']),
+            # Covers date range totals without reading the table
+            models.Index(name='account_txn_date_amount_idx', fields=['date', 'amount', 'deposits']),
+            # Keyset pages of the transactions endpoint, newest first
+            models.Index(name='account_txn_date_id_idx', fields=['-date', '-id'])
+        ]
 
 
 class CardTransaction(Transaction):
+    # Indexed through the composite indexes that lead with it
+    snapshot = models.ForeignKey(CardSnapshot, db_index=False, on_delete=models.CASCADE)
     # transaction date is the date used for base transactions
     post_date = models.DateField('post date', null=True)
     cash_rebate = models.DecimalField(max_digits=20, decimal_places=2, null=True)
 
-    class Meta:
+    class Meta(Transaction.Meta):
         db_table = 'project_card_transaction'
+        indexes = [
+            # Instrument and date range, ordered by date
+            models.Index(name='card_txn_snapshot_date_idx', fields=['snapshot', 'date']),
+            # Covers date range totals without reading the table
+            models.Index(name='card_txn_date_amount_idx', fields=['date', 'amount']),
+            models.Index(name='card_txn_post_date_idx', fields=['post_date']),
+            # Keyset pages of the transactions endpoint, newest first
+            models.Index(name='card_txn_date_id_idx', fields=['-date', '-id'])
+        ]
+
+
+class MonthlyRollup(LoggableModel):
+    class Direction(models.TextChoices):
+        SPEND = 'SPEND', _('Spend')
+        INCOME = 'INCOME', _('Income')
+
+    # Exactly one of account and card is set
+    account = models.ForeignKey(Account, null=True, on_delete=models.CASCADE)
+    card = models.ForeignKey(Card, null=True, on_delete=models.CASCADE)
+    month = models.DateField('first day of the month')
+    direction = models.CharField(max_length=10, choices=Direction)
+    total = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    transaction_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'project_monthly_rollup'
+        constraints = [
+            models.UniqueConstraint(name='unique_account_monthly_rollup', fields=['account', 'month', 'direction']),
+            models.UniqueConstraint(name='unique_card_monthly_rollup', fields=['card', 'month', 'direction']),
+            models.CheckConstraint(name='monthly_rollup_one_instrument',
+                                   check=(models.Q(account__isnull=False, card__isnull=True) |
+                                          models.Q(account__isnull=True, card__isnull=False)))
+        ]
+        indexes = [
+            models.Index(name='monthly_rollup_month_idx', fields=['month', 'direction'])
+        ]
@@ -0,0 +1,119 @@
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+from typing import Iterable, Type
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+
+from components.models import AccountTransaction, \
+    CardTransaction, \
+    MonthlyRollup, \
+    Snapshot, \
+    Transaction
+
+# Instrument field of the rollup and the transaction field summed for each direction
+ROLLUP_FIELDS = {
+    AccountTransaction: ('account', {MonthlyRollup.Direction.SPEND: 'amount',
+                                     MonthlyRollup.Direction.INCOME: 'deposits'}),
+    CardTransaction: ('card', {MonthlyRollup.Direction.SPEND: 'amount',
+                               MonthlyRollup.Direction.INCOME: 'cash_rebate'})
+}
+
+
+def rollup_contributions(transaction_model: Type[Transaction], rows: Iterable) -> dict:
+    """
+    Sum transactions of one instrument into {(month, direction): [total, count]}. Rows are transaction objects or
+    dicts of their fields; transactions without a date belong to no month and are left out.
+    """
+    direction_fields = ROLLUP_FIELDS[transaction_model][1]
+    contributions = defaultdict(lambda: [Decimal(0), 0])
+    for row in rows:
+        row = row if isinstance(row, dict) else vars(row)
+        date = row['date']
+        if date is None:
+            continue
+        # Parsers may hand over datetimes, which the date column truncates
+        if isinstance(date, datetime.datetime):
+            date = date.date()
+        month = date.replace(day=1)
+        for direction, field in direction_fields.items():
+            if row[field] is not None:
+                bucket = contributions[(month, direction)]
+                bucket[0] += row[field]
+                bucket[1] += 1
+    return contributions
+
+
+def stored_contributions(transaction_model: Type[Transaction], snapshot: Snapshot, row_numbers: Iterable[int]):
+    """
+    The contributions of the stored rows that an upsert of row_numbers is about to overwrite.
+    """
+    row_numbers = set(row_numbers)
+    if not row_numbers:
+        return {}
+    direction_fields = ROLLUP_FIELDS[transaction_model][1]
+    # A range keeps the query within SQLite's parameter limit, rows outside the upsert are filtered out here
+    stored = (transaction_model.objects
+              .filter(snapshot=snapshot, row_number__range=(min(row_numbers), max(row_numbers)))
+              .values('row_number', 'date', *direction_fields.values()))
+    return rollup_contributions(transaction_model, (row for row in stored if row['row_number'] in row_numbers))
+
+
+def trailing_contributions(transaction_model: Type[Transaction], snapshot: Snapshot, last_row_number: int):
+    """
+    The contributions of the stored rows after last_row_number, which a re-ingest that parsed fewer rows removes, or
+    None when there are no such rows.
+    """
+    direction_fields = ROLLUP_FIELDS[transaction_model][1]
+    stored = list(transaction_model.objects
+                  .filter(snapshot=snapshot, row_number__gt=last_row_number)
+                  .values('date', *direction_fields.values()))
+    return rollup_contributions(transaction_model, stored) if stored else None
+
+
+def apply_rollup_deltas(transaction_model: Type[Transaction], snapshot: Snapshot, old: dict, new: dict):
+    """
+    Move the rollups of the snapshot's instrument from the old contributions to the new ones.
+    """
+    instrument_field = ROLLUP_FIELDS[transaction_model][0]
+    instrument_id = getattr(snapshot.instrument_statement, f'{instrument_field}_id')
+    for month, direction in old.keys() | new.keys():
+        old_total, old_count = old.get((month, direction), (0, 0))
+        new_total, new_count = new.get((month, direction), (0, 0))
+        total = new_total - old_total
+        count = new_count - old_count
+        if not total and not count:
+            continue
+        lookup = {instrument_field + '_id': instrument_id, 'month': month, 'direction': direction}
+        updated = (MonthlyRollup.objects
+                   .filter(**lookup)
+                   .update(total=F('total') + total, transaction_count=F('transaction_count') + count))
+        if not updated:
+            MonthlyRollup.objects.create(total=total, transaction_count=count, **lookup)
+        elif count < 0:
+            # Match a rebuild, which has no rollups for months without transactions
+            MonthlyRollup.objects.filter(transaction_count=0, **lookup).delete()
+
+
+def rebuild_monthly_rollups():
+    """
+    Recompute every rollup from the transaction tables, e.g. after transactions were deleted.
+    """
+    with transaction.atomic():
+        MonthlyRollup.objects.all().delete()
+        for transaction_model, (instrument_field, direction_fields) in ROLLUP_FIELDS.items():
+            instrument = f'snapshot__instrument_statement__{instrument_field}'
+            for direction, field in direction_fields.items():
+                totals = (transaction_model.objects
+                          .filter(date__isnull=False, **{f'{field}__isnull': False})
+                          .annotate(month=TruncMonth('date'))
+                          .values(instrument, 'month')
+                          .annotate(total=Sum(field), transaction_count=Count('pk')))
+                MonthlyRollup.objects.bulk_create([MonthlyRollup(**{instrument_field + '_id': row[instrument]},
+                                                                 month=row['month'],
+                                                                 direction=direction,
+                                                                 total=row['total'],
+                                                                 transaction_count=row['transaction_count'])
+                                                   for row in totals.iterator()], batch_size=500)
@@ -0,0 +1,57 @@
+import datetime
+from typing import List, NamedTuple, Union
+
+from django.db import connection
+
+from components.models import AccountTransaction, CardTransaction, Instrument
+
+# Row ids in the search table are id * 2 + kind, see migration 0005_transaction_search
+SEARCH_KINDS = [AccountTransaction, CardTransaction]
+SEARCH_LIMIT = 50
+
+
+class SearchHit(NamedTuple):
+    transaction: Union[AccountTransaction, CardTransaction]
+    instrument: Instrument
+    statement_date: datetime.date
+    rank: float
+
+
+def search_transactions(text: str, limit: int = SEARCH_LIMIT) -> List[SearchHit]:
+    """
+    Full text search over the descriptions and sub-descriptions of account and card transactions, best matches
+    first. Every word of the text has to match the start of a word in the transaction.
+    """
+    query = to_match_query(text)
+    if not query:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT rowid, bm25(project_transaction_search) AS rank '
+                       'FROM project_transaction_search '
+                       'WHERE project_transaction_search MATCH %s '
+                       'ORDER BY rank LIMIT %s', [query, limit])
+        ranked = cursor.fetchall()
+
+    # One query per transaction table for the hits and everything shown with them
+    transactions_by_kind = {}
+    for kind, transaction_model in enumerate(SEARCH_KINDS):
+        ids = [rowid // 2 for rowid, rank in ranked if rowid % 2 == kind]
+        transactions_by_kind[kind] = (transaction_model.objects
+                                      .select_related('snapshot__instrument_statement__statement',
+                                                      'snapshot__instrument_statement__account',
+                                                      'snapshot__instrument_statement__card')
+                                      .in_bulk(ids)) if ids else {}
+
+    hits = []
+    for rowid, rank in ranked:
+        transaction = transactions_by_kind[rowid % 2].get(rowid // 2)
+        if transaction is None:
+            continue
+        instrument_statement = transaction.snapshot.instrument_statement
+        hits.append(SearchHit(transaction, instrument_statement.instrument, instrument_statement.statement.date, rank))
+    return hits
+
+
+def to_match_query(text: str):
+    # Quoting each word keeps FTS5 operators and punctuation in the text from being parsed as query syntax
+    return ' '.join('"{}"*'.format(word.replace('"', '""')) for word in text.split())
@@ -1,3 +1,245 @@
+import datetime
+import json
+from collections import defaultdict
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import F, Sum, Value, Window
+from django.db.models.functions import Coalesce, TruncMonth
 from django.test import TestCase
 
-# Create your tests here.
+from components.analytics import KINDS, \
+    instrument_totals, \
+    load_transaction_frame, \
+    monthly_totals, \
+    running_balances, \
+    sum_by
+from components.models import AccountTransaction, \
+    Card, \
+    CardSnapshot, \
+    CardTransaction, \
+    InstrumentStatement, \
+    MonthlyRollup
+from components.rollups import ROLLUP_FIELDS, rebuild_monthly_rollups
+from document_consumer import synthetic
+from document_consumer.synthetic import create_snapshot, persist
+
+
+class MonthlyRollupTests(TestCase):
+    def rollups(self):
+        return {(rollup.account_id, rollup.month, rollup.direction): (rollup.total, rollup.transaction_count)
+                for rollup in MonthlyRollup.objects.all()}
+
+    def assertRollupsMatchRebuild(self):
+        rollups = self.rollups()
+        rebuild_monthly_rollups()
+        self.assertEqual(rollups, self.rollups())
+
+    def test_ingest(self):
+        snapshot = create_snapshot()
+        rows = synthetic.account_transaction_dicts(50)
+        persist(snapshot, rows)
+
+        account_id = snapshot.instrument_statement.account_id
+        month = rows[0]['date'].replace(day=1)
+        spend = [row['amount'] for row in rows if row['amount'] is not None]
+        self.assertEqual(self.rollups()[(account_id, month, MonthlyRollup.Direction.SPEND)], (sum(spend), len(spend)))
+        self.assertRollupsMatchRebuild()
+
+    def test_reingest_applies_deltas(self):
+        snapshot = create_snapshot()
+        rows = synthetic.account_transaction_dicts(50)
+        persist(snapshot, rows)
+
+        changed = [dict(row) for row in rows]
+        # Moved to another month, a spend turned into a deposit, a changed amount
+        changed[0]['date'] = changed[0]['date'].replace(month=2, day=1)
+        spend = next(i for i, row in enumerate(changed) if row['amount'] is not None)
+        changed[spend] |= {'deposits': changed[spend]['amount'], 'amount': None}
+        changed[-1] |= {'amount': changed[-1]['amount'] + 1} if changed[-1]['amount'] else {'deposits': 1}
+        persist(snapshot, changed)
+
+        self.assertRollupsMatchRebuild()
+
+    def test_reingest_unchanged(self):
+        snapshot = create_snapshot()
+        rows = synthetic.account_transaction_dicts(50)
+        persist(snapshot, rows)
+        rollups = self.rollups()
+
+        persist(snapshot, rows)
+
+        self.assertEqual(self.rollups(), rollups)
+
+    def test_reingest_with_fewer_rows(self):
+        snapshot = create_snapshot()
+        rows = synthetic.account_transaction_dicts(50)
+        persist(snapshot, rows)
+
+        persist(snapshot, rows[:30])
+
+        self.assertEqual(AccountTransaction.objects.filter(snapshot=snapshot).count(), 30)
+        self.assertRollupsMatchRebuild()
+
+    def test_month_without_transactions_has_no_rollup(self):
+        snapshot = create_snapshot()
+        rows = synthetic.account_transaction_dicts(10)
+        persist(snapshot, rows)
+
+        persist(snapshot, [row | {'date': row['date'].replace(month=2, day=1)} for row in rows])
+
+        self.assertEqual({month.month for account_id, month, direction in self.rollups()}, {2})
+        self.assertRollupsMatchRebuild()
+
+
+class StatementRecorder:
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.statements.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+class TransactionPageTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('reader'))
+        # Five distinct dates, so pages have to be split between transactions on the same date
+        persist(create_snapshot(), synthetic.account_transaction_dicts(45, statement_date=datetime.date(2024, 1, 5)))
+
+    def get_page(self, **parameters):
+        response = self.client.get('/transactions/account/', parameters)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_cursor_walks_every_transaction_once(self):
+        pks = []
+        pages = 0
+        parameters = {'limit': 10}
+        while True:
+            page = self.get_page(**parameters)
+            pks.extend(row['id'] for row in page['results'])
+            pages += 1
+            if page['next'] is None:
+                break
+            parameters['cursor'] = page['next']
+
+        self.assertEqual(pages, 5)
+        self.assertEqual(pks, list(AccountTransaction.objects.order_by('-date', '-pk').values_list('pk', flat=True)))
+
+    def test_last_full_page_has_no_next(self):
+        page = self.get_page(limit=45)
+        self.assertEqual(len(page['results']), 45)
+        self.assertIsNone(page['next'])
+
+    def test_cursor_page_is_read_in_index_order(self):
+        cursor = self.get_page(limit=10)['next']
+        statements = StatementRecorder()
+        with connection.execute_wrapper(statements):
+            self.get_page(limit=10, cursor=cursor)
+        # Explained with the parameters bound, SQLite plans literals differently
+        sql, params = next((sql, params) for sql, params in statements.statements
+                           if 'project_account_transaction' in sql)
+        with connection.cursor() as explain:
+            explain.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(row[-1] for row in explain.fetchall())
+        self.assertIn('account_txn_date_id_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/transactions/account/', {'cursor': 'not a cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+class TransactionFrameTests(TestCase):
+    """
+    Each aggregate of the frame against the same aggregate computed by the database.
+    """
+
+    def setUp(self):
+        snapshot = create_snapshot()
+        # Spread over two months
+        rows = synthetic.account_transaction_dicts(60)
+        persist(snapshot, [row | {'date': row['date'].replace(month=2, day=1)} if i % 3 == 0 else row
+                           for i, row in enumerate(rows)])
+
+        statement = snapshot.instrument_statement.statement
+        card = Card.objects.create(holder=statement.holder, provider=statement.provider, name='Card', number='1',
+                                   name_on_card=synthetic.HOLDER_NAME, currency='SGD')
+        card_snapshot = CardSnapshot.objects.create(
+            instrument_statement=InstrumentStatement.objects.create(card=card, statement=statement),
+            total_credit_limit=0)
+        CardTransaction.objects.bulk_create(
+            CardTransaction(snapshot=card_snapshot, row_number=i, date=row['date'], description=row['description'],
+                            sub_description='', amount=row['amount'], cash_rebate=row['deposits'])
+            for i, row in enumerate(synthetic.account_transaction_dicts(40, seed=1), start=1))
+        self.frame = load_transaction_frame()
+
+    def database_sums(self, key, by_instrument=False):
+        """
+        Spend and income cents summed in the database, grouped by instrument kind and key, and by instrument id when
+        by_instrument is set.
+        """
+        sums = defaultdict(lambda: [0, 0])
+        for kind, transaction_model in enumerate(KINDS):
+            instrument_field, direction_fields = ROLLUP_FIELDS[transaction_model]
+            keys = [key, f'snapshot__instrument_statement__{instrument_field}_id'] if by_instrument else [key]
+            for *group, spend, income in (transaction_model.objects
+                                          .values_list(*keys)
+                                          .annotate(*(Sum(field, default=0) for field in direction_fields.values()))
+                                          .order_by()):
+                sums[(kind, *group)][0] += int(spend * 100)
+                sums[(kind, *group)][1] += int(income * 100)
+        return sums
+
+    def test_monthly_totals(self):
+        database_totals = defaultdict(lambda: [0, 0])
+        for (kind, month), sums in self.database_sums(TruncMonth('date')).items():
+            database_totals[month][0] += sums[0]
+            database_totals[month][1] += sums[1]
+
+        totals = monthly_totals(self.frame)
+        self.assertEqual({month.item(): [int(spend), int(income)]
+                          for month, spend, income in zip(totals.months, totals.spend, totals.income)},
+                         database_totals)
+
+    def test_instrument_totals(self):
+        database_totals = defaultdict(lambda: [0, 0])
+        for (kind, date, instrument_id), sums in self.database_sums('date', by_instrument=True).items():
+            database_totals[(kind, instrument_id)][0] += sums[0]
+            database_totals[(kind, instrument_id)][1] += sums[1]
+
+        totals = instrument_totals(self.frame)
+        self.assertEqual({(int(kind), int(instrument_id)): [int(spend), int(income)]
+                          for kind, instrument_id, spend, income in zip(*totals)},
+                         database_totals)
+
+    def test_running_balances(self):
+        database_balances = {}
+        for kind, transaction_model in enumerate(KINDS):
+            instrument_field, direction_fields = ROLLUP_FIELDS[transaction_model]
+            spend_field, income_field = direction_fields.values()
+            amount_field = transaction_model._meta.get_field('amount')
+            net = (Coalesce(income_field, Value(0), output_field=amount_field) -
+                   Coalesce(spend_field, Value(0), output_field=amount_field))
+            for pk, balance in transaction_model.objects.values_list('pk').annotate(balance=Window(
+                    Sum(net),
+                    partition_by=F(f'snapshot__instrument_statement__{instrument_field}_id'),
+                    order_by=['date', 'pk'])):
+                database_balances[(kind, pk)] = int(balance * 100)
+
+        balances = running_balances(self.frame)
+        self.assertEqual({(int(kind), int(pk)): int(balance)
+                          for kind, pk, balance in zip(self.frame.kind, self.frame.id, balances)},
+                         database_balances)
+
+    def test_sum_by(self):
+        database_spend = defaultdict(int)
+        for (kind, date), sums in self.database_sums('date').items():
+            database_spend[date] += sums[0]
+
+        days, day_codes = np.unique(self.frame.dates, return_inverse=True)
+        self.assertEqual({day.item(): int(spend) for day, spend in zip(days, sum_by(day_codes, self.frame.spend,
+                                                                                     len(days)))},
+                         database_spend)
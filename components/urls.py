@@ -0,0 +1,10 @@
+from django.urls import path
+
+from components import views
+
+app_name = 'components'
+
+urlpatterns = [
+    path('search/', views.search, name='search'),
+    path('<str:kind>/', views.transactions, name='transactions'),
+]
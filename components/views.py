@@ -1,3 +1,116 @@
-from django.shortcuts import render
+import base64
+import datetime
+import json
+from decimal import Decimal, InvalidOperation
 
-# Create your views here.
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from components.models import AccountTransaction, CardTransaction
+from components.search import SEARCH_LIMIT, search_transactions
+
+MAX_SEARCH_LIMIT = 500
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+TRANSACTION_KINDS = {
+    'account': (AccountTransaction, 'account', ['deposits', 'balance']),
+    'card': (CardTransaction, 'card', ['post_date', 'cash_rebate'])
+}
+
+
+@require_GET
+def search(request):
+    """
+    Ranked full text search over transaction descriptions, e.g. /transactions/search/?q=grab+food&limit=20
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+    try:
+        limit = max(min(int(request.GET.get('limit', SEARCH_LIMIT)), MAX_SEARCH_LIMIT), 1)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be a number'}, status=400)
+
+    hits = search_transactions(request.GET.get('q', ''), limit)
+    return JsonResponse({'results': [{
+        'kind': 'account' if isinstance(hit.transaction, AccountTransaction) else 'card',
+        'id': hit.transaction.pk,
+        'date': hit.transaction.date,
+        'description': hit.transaction.description,
+        'sub_description': hit.transaction.sub_description,
+        'amount': hit.transaction.amount,
+        'instrument': {'id': hit.instrument.pk, 'name': hit.instrument.name, 'number': hit.instrument.number},
+        'statement_date': hit.statement_date,
+        'rank': hit.rank
+    } for hit in hits]})
+
+
+@require_GET
+def transactions(request, kind):
+    """
+    Transactions of one kind ('account' or 'card'), newest first, filtered by the instrument, holder, provider,
+    date_from, date_to, amount_min and amount_max query parameters. Pages continue from the cursor returned as 'next',
+    which seeks past the last (date, id) along the (date, id) index instead of counting skipped rows, so every page
+    costs the same. Transactions without a date are not listed.
+    """
+    if kind not in TRANSACTION_KINDS:
+        raise Http404
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+    transaction_model, instrument_field, extra_fields = TRANSACTION_KINDS[kind]
+    instrument = f'snapshot__instrument_statement__{instrument_field}'
+
+    try:
+        page_size = max(min(int(request.GET.get('limit', PAGE_SIZE)), MAX_PAGE_SIZE), 1)
+        filters = {}
+        for parameter, lookup, parse in [('instrument', instrument, int),
+                                         ('holder', f'{instrument}__holder', int),
+                                         ('provider', f'{instrument}__provider', int),
+                                         ('date_from', 'date__gte', datetime.date.fromisoformat),
+                                         ('date_to', 'date__lte', datetime.date.fromisoformat),
+                                         ('amount_min', 'amount__gte', Decimal),
+                                         ('amount_max', 'amount__lte', Decimal)]:
+            if parameter in request.GET:
+                filters[lookup] = parse(request.GET[parameter])
+        queryset = transaction_model.objects.filter(date__isnull=False, **filters)
+        if 'cursor' in request.GET:
+            cursor_date, cursor_id = decode_cursor(request.GET['cursor'])
+            # A range on date with the tie-break inside it, a top level OR would make SQLite sort the rows again
+            queryset = queryset.filter(Q(date__lt=cursor_date) | Q(pk__lt=cursor_id), date__lte=cursor_date)
+    except (ValueError, InvalidOperation):
+        return JsonResponse({'error': 'Invalid query parameter'}, status=400)
+
+    rows = (queryset
+            .order_by('-date', '-pk')
+            .values('id', 'date', 'description', 'sub_description', 'amount', *extra_fields,
+                    instrument=F(f'{instrument}_id'),
+                    statement_date=F('snapshot__instrument_statement__statement__date'))
+            [:page_size + 1])
+    return StreamingHttpResponse(stream_page(rows, page_size), content_type='application/json')
+
+
+def stream_page(rows, page_size: int):
+    # Rows are encoded as they come off the cursor instead of collecting the page first
+    encoder = DjangoJSONEncoder()
+    yield '{"results": ['
+    last = None
+    for i, row in enumerate(rows.iterator(chunk_size=page_size + 1)):
+        if i == page_size:
+            yield f'], "next": {json.dumps(encode_cursor(last["date"], last["id"]))}}}'
+            return
+        yield (',' if i else '') + encoder.encode(row)
+        last = row
+    yield '], "next": null}'
+
+
+def encode_cursor(date: datetime.date, pk: int):
+    return base64.urlsafe_b64encode(f'{date.isoformat()}|{pk}'.encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        date, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError(f'Invalid cursor {cursor}')
+    return datetime.date.fromisoformat(date), int(pk)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class DocumentConsumerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'document_consumer'
+
+    def ready(self):
+        from document_consumer import signals  # noqa: F401
@@ -0,0 +1,5 @@
+import csv
+
+
+def read_csv_rows(csvfile):
+    return (row for row in csv.reader(csvfile) if row)
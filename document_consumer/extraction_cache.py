@@ -0,0 +1,65 @@
+import os
+import pickle
+import zlib
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+
+from django.conf import settings
+from pdf_reader import get_elements_from_pdf
+
+from document_consumer.timing import count
+
+CACHE_FILE_SUFFIX = '.pages'
+
+try:
+    PDF_READER_VERSION = version('pdf_reader')
+except PackageNotFoundError:
+    PDF_READER_VERSION = 'unknown'
+
+
+def get_cached_elements_from_pdf(file_name, content_hash):
+    """
+    Drop-in replacement for get_elements_from_pdf backed by an on-disk cache keyed by file contents and pdf_reader
+    version. Entries are compressed pickles; the least recently used ones are evicted once the cache outgrows
+    EXTRACTION_CACHE_MAX_BYTES.
+    """
+    cache_dir = Path(settings.EXTRACTION_CACHE_DIR)
+    cache_file = cache_dir / f'{content_hash}-{PDF_READER_VERSION}{CACHE_FILE_SUFFIX}'
+    try:
+        with open(cache_file, 'rb') as file:
+            pages = pickle.loads(zlib.decompress(file.read()))
+        # Bump mtime so eviction sees this entry as recently used
+        os.utime(cache_file)
+        count(extraction_cache_hits=1)
+        return pages
+    except (FileNotFoundError, pickle.UnpicklingError, zlib.error, EOFError):
+        pass
+
+    count(extraction_cache_misses=1)
+    pages = get_elements_from_pdf(file_name)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # Write then rename so concurrent workers never read a partial entry
+    temp_file = cache_file.with_suffix(f'.{os.getpid()}.tmp')
+    with open(temp_file, 'wb') as file:
+        file.write(zlib.compress(pickle.dumps(pages, protocol=pickle.HIGHEST_PROTOCOL)))
+    os.replace(temp_file, cache_file)
+    evict_extraction_cache(cache_dir, settings.EXTRACTION_CACHE_MAX_BYTES)
+
+    return pages
+
+
+def evict_extraction_cache(cache_dir: Path, max_bytes: int, suffix: str = CACHE_FILE_SUFFIX):
+    entries = []
+    for cache_file in cache_dir.glob(f'*{suffix}'):
+        try:
+            entries.append((cache_file.stat(), cache_file))
+        except FileNotFoundError:
+            # Evicted by another worker
+            continue
+
+    total_bytes = sum(stat.st_size for stat, cache_file in entries)
+    for stat, cache_file in sorted(entries, key=lambda entry: entry[0].st_mtime):
+        if total_bytes <= max_bytes:
+            break
+        cache_file.unlink(missing_ok=True)
+        total_bytes -= stat.st_size
@@ -0,0 +1,57 @@
+from typing import List, NamedTuple, Optional
+
+from pdfminer.high_level import extract_text
+from pdfminer.pdfpage import PDFPage
+
+from components.models import Statement
+from document_consumer.registry import CSV_ROWS, PDF_PAGES, PDF_TEXT, detect
+
+
+class Fingerprint(NamedTuple):
+    bank: str
+    statement_type: Statement.InstrumentType
+
+
+def fingerprint_pdf(file_name) -> Optional[Fingerprint]:
+    """
+    Identify the bank and statement type from the text layer of the first page without layout analysis. Returns None
+    when the first page has no text layer, e.g. a scanned statement, in which case the extracted pages have to be
+    inspected with fingerprint_pages. Raises ValueError for any other document.
+    """
+    first_page_text = normalise_text(extract_text(file_name, maxpages=1))
+    if not first_page_text:
+        return None
+
+    detected = detect(PDF_TEXT, file_name, first_page_text)
+    if detected is None:
+        raise ValueError(f'{file_name} is not a recognised statement')
+    return Fingerprint(*detected)
+
+
+def fingerprint_pages(pages) -> Fingerprint:
+    """
+    Identify the bank and statement type from fixed positions in fully extracted pages.
+    """
+    detected = detect(PDF_PAGES, pages)
+    if detected is None:
+        raise ValueError('Pages are not from a recognised statement')
+    return Fingerprint(*detected)
+
+
+def fingerprint_csv(rows: List[list]) -> Fingerprint:
+    detected = detect(CSV_ROWS, rows)
+    if detected is None:
+        raise ValueError('Rows are not from a recognised statement')
+    return Fingerprint(*detected)
+
+
+def last_page_text(file_name) -> str:
+    with open(file_name, 'rb') as file:
+        # Walks the page tree only, no page content is parsed
+        page_count = sum(1 for page in PDFPage.get_pages(file))
+    return normalise_text(extract_text(file_name, page_numbers=[page_count - 1]))
+
+
+def normalise_text(text: str):
+    # Lines may wrap differently from the layout pdf_reader reconstructs
+    return ' '.join(text.split())
@@ -0,0 +1,243 @@
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, BrokenExecutor, ProcessPoolExecutor, wait
+from datetime import timedelta
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from django.conf import settings
+from django.db import OperationalError, close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from components.models import InstrumentHolder
+from document_consumer.models import IngestionJob
+from document_consumer.resolver import resolver
+from document_consumer.services import check_ingested, \
+    extract_statement, \
+    hash_file, \
+    persist_statement, \
+    record_ingested
+from document_consumer.timing import BatchTiming, FileTiming, call_recording, recording, span, timing_enabled
+
+FINAL_STATES = [IngestionJob.State.SUCCEEDED, IngestionJob.State.FAILED, IngestionJob.State.SKIPPED]
+RUNNING_STATES = [IngestionJob.State.EXTRACTING, IngestionJob.State.PERSISTING]
+# Seconds between looking for new jobs while idle or waiting for extractions
+POLL_INTERVAL = 1
+# Most seconds between refreshing the claims of in-flight jobs, at most a quarter of INGESTION_JOB_TIMEOUT
+HEARTBEAT_INTERVAL = 60
+CLAIM_CANDIDATES = 10
+# Failures a later attempt may not run into: a locked database, a file still being copied, a crashed extraction
+# process. Anything else, e.g. an unrecognised or malformed statement, fails on the first attempt
+TRANSIENT_ERRORS = (OperationalError, OSError, BrokenExecutor)
+
+background_runner = None
+background_runner_lock = threading.Lock()
+
+
+def enqueue_job(file_name, force=False, holder: InstrumentHolder = None) -> IngestionJob:
+    return IngestionJob.objects.create(file_path=str(Path(file_name).resolve()),
+                                       force=force,
+                                       holder=holder,
+                                       max_attempts=settings.INGESTION_MAX_ATTEMPTS)
+
+
+def claim_job(worker_id: str, job_ids: Iterable[int] = None) -> Optional[IngestionJob]:
+    """
+    Take the oldest queued job that is due. The state check in the update makes each claim a compare and set, so
+    runners in other threads or processes never pick up the same job.
+    """
+    now = timezone.now()
+    candidates = IngestionJob.objects.filter(state=IngestionJob.State.QUEUED, available_at__lte=now)
+    if job_ids is not None:
+        candidates = candidates.filter(pk__in=job_ids)
+    for job_id in candidates.order_by('available_at', 'pk').values_list('pk', flat=True)[:CLAIM_CANDIDATES]:
+        claimed = (IngestionJob.objects
+                   .filter(pk=job_id, state=IngestionJob.State.QUEUED)
+                   .update(state=IngestionJob.State.EXTRACTING,
+                           claimed_by=worker_id,
+                           claimed_at=now,
+                           attempts=F('attempts') + 1))
+        if claimed:
+            job = IngestionJob.objects.get(pk=job_id)
+            if job.started_at is None:
+                job.started_at = now
+                job.save(update_fields=['started_at'])
+            return job
+    return None
+
+
+def requeue_stale_jobs():
+    """
+    Release jobs whose runner stopped responding, e.g. a server that was restarted mid extraction. Runners refresh
+    claimed_at of their jobs while those are in flight, so a slow extraction is not taken for a dead runner.
+    """
+    timeout = timedelta(seconds=settings.INGESTION_JOB_TIMEOUT)
+    stale = IngestionJob.objects.filter(state__in=RUNNING_STATES, claimed_at__lt=timezone.now() - timeout)
+    stale.filter(attempts__gte=F('max_attempts')).update(state=IngestionJob.State.FAILED,
+                                                         claimed_by=None,
+                                                         finished_at=timezone.now(),
+                                                         error='Runner stopped responding')
+    stale.update(state=IngestionJob.State.QUEUED, claimed_by=None, available_at=timezone.now())
+
+
+def retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=settings.INGESTION_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+class JobRunner:
+    """
+    Claims queued ingestion jobs and keeps up to `workers` extractions in flight. Extraction runs in a process pool
+    and the runner's own thread persists each result, as in the ingest_statements command. An attempt that failed
+    with a transient error is requeued with exponential backoff while the runner carries on with the rest of the
+    queue; any other failure is final. Each extraction runs tesseract on at most cpu_count // workers threads, also
+    when it is the only one in flight.
+
+    With a BatchTiming (or INGESTION_TIMING on) the stages of every statement are timed, in the extraction process
+    and in this one, logged per statement and summed into the batch timing.
+    """
+
+    def __init__(self,
+                 workers: int = None,
+                 on_finished: Callable[[IngestionJob], None] = None,
+                 timing: BatchTiming = None):
+        self.workers = workers or settings.INGESTION_WORKERS
+        # A fixed share of the cores per extraction process, so a full pool running tesseract never oversubscribes
+        self.ocr_threads = max((os.cpu_count() or 1) // self.workers, 1)
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+        self.on_finished = on_finished
+        if timing is None and timing_enabled():
+            timing = BatchTiming()
+        self.timing = timing
+        self.stopped = threading.Event()
+
+    def run(self, job_ids: Iterable[int] = None):
+        """
+        Run until stop() is called or, when job_ids is given, until each of those jobs has reached a final state.
+        Only the given jobs are claimed in that case.
+        """
+        if job_ids is not None:
+            job_ids = list(job_ids)
+        in_flight = {}
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        heartbeat_interval = min(HEARTBEAT_INTERVAL, settings.INGESTION_JOB_TIMEOUT / 4)
+        last_heartbeat = time.monotonic()
+        try:
+            while not self.stopped.is_set():
+                close_old_connections()
+                if time.monotonic() - last_heartbeat >= heartbeat_interval:
+                    self.heartbeat(in_flight.values())
+                    last_heartbeat = time.monotonic()
+                requeue_stale_jobs()
+                claimed = []
+                while len(in_flight) + len(claimed) < self.workers and (job := claim_job(self.worker_id, job_ids)):
+                    claimed.append(job)
+                for job in claimed:
+                    future = self.start(executor, job)
+                    if future is not None:
+                        in_flight[future] = job
+
+                if not in_flight:
+                    if job_ids is not None and not (IngestionJob.objects
+                                                    .filter(pk__in=job_ids)
+                                                    .exclude(state__in=FINAL_STATES)
+                                                    .exists()):
+                        break
+                    # Reference entities may be edited through the admin while the queue is idle
+                    resolver.invalidate()
+                    self.stopped.wait(POLL_INTERVAL)
+                    continue
+
+                done, _ = wait(in_flight, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self.finish(in_flight.pop(future), future)
+        finally:
+            executor.shutdown(cancel_futures=True)
+            # Unfinished jobs go back to the queue without using up an attempt
+            for job in in_flight.values():
+                IngestionJob.objects.filter(pk=job.pk).update(state=IngestionJob.State.QUEUED,
+                                                              claimed_by=None,
+                                                              attempts=F('attempts') - 1)
+
+    def stop(self):
+        self.stopped.set()
+
+    def heartbeat(self, jobs: Iterable[IngestionJob]):
+        job_ids = [job.pk for job in jobs]
+        if job_ids:
+            (IngestionJob.objects
+             .filter(pk__in=job_ids, claimed_by=self.worker_id, state__in=RUNNING_STATES)
+             .update(claimed_at=timezone.now()))
+
+    def start(self, executor, job: IngestionJob):
+        try:
+            content_hash = None
+            file_timing = FileTiming(job.file_path) if self.timing is not None else None
+            with recording(file_timing), span('hash'):
+                if not job.force:
+                    already_ingested, content_hash = check_ingested(job.file_path)
+                    if already_ingested:
+                        self.complete(job, IngestionJob.State.SKIPPED)
+                        return None
+                job.content_hash = content_hash or hash_file(job.file_path)
+            job.save(update_fields=['content_hash'])
+            # The timing travels to the extraction process and back with the result
+            return executor.submit(call_recording, file_timing, extract_statement, job.file_path, job.content_hash,
+                                   self.ocr_threads)
+        except Exception as e:
+            self.fail(job, e)
+            return None
+
+    def finish(self, job: IngestionJob, future):
+        try:
+            extracted, file_timing = future.result()
+            job.state = IngestionJob.State.PERSISTING
+            job.save(update_fields=['state'])
+            with recording(file_timing):
+                persist_statement(job.file_path, extracted, job.holder)
+                record_ingested(job.file_path, job.content_hash)
+        except Exception as e:
+            self.fail(job, e)
+        else:
+            if file_timing is not None:
+                file_timing.log()
+                self.timing.add(file_timing)
+            self.complete(job, IngestionJob.State.SUCCEEDED)
+
+    def complete(self, job: IngestionJob, state: IngestionJob.State):
+        job.state = state
+        job.claimed_by = None
+        job.finished_at = timezone.now()
+        job.error = None
+        job.save(update_fields=['state', 'claimed_by', 'finished_at', 'error'])
+        if self.on_finished:
+            self.on_finished(job)
+
+    def fail(self, job: IngestionJob, error: Exception):
+        logging.warning(f'Ingestion job {job.pk} for {job.file_path} failed on attempt {job.attempts}', exc_info=error)
+        job.error = ''.join(traceback.format_exception(error))
+        job.claimed_by = None
+        if isinstance(error, TRANSIENT_ERRORS) and job.attempts < job.max_attempts:
+            job.state = IngestionJob.State.QUEUED
+            job.available_at = timezone.now() + retry_delay(job.attempts)
+        else:
+            job.state = IngestionJob.State.FAILED
+            job.finished_at = timezone.now()
+        job.save(update_fields=['error', 'claimed_by', 'state', 'available_at', 'finished_at'])
+        if self.on_finished:
+            self.on_finished(job)
+
+
+def start_background_runner():
+    """
+    Start the in-process runner used by the upload endpoint, once per server process.
+    """
+    global background_runner
+    with background_runner_lock:
+        if background_runner is None:
+            background_runner = JobRunner()
+            threading.Thread(target=background_runner.run, name='ingestion-runner', daemon=True).start()
@@ -0,0 +1,160 @@
+import decimal
+import logging
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, List, Optional
+
+
+class RowClusters:
+    """
+    Groups page elements into visual rows by y coordinate. A line joins a row when it lies within tolerance of the row,
+    directly or through a chain of neighbouring lines, so rows come out merged and ordered from the top of the page
+    down without sorting a dict of coordinates per table.
+    """
+
+    def __init__(self, tolerance: float):
+        self.tolerance = tolerance
+        # Parallel arrays, one entry per row, ascending by y
+        self.bottoms = []
+        self.tops = []
+        self.lines = []
+
+    def add(self, y_coor: float, item):
+        i = bisect_right(self.bottoms, y_coor + self.tolerance)
+        if i > 0 and self.tops[i - 1] >= y_coor - self.tolerance:
+            # Join the row below the insertion point
+            i -= 1
+            self.bottoms[i] = min(self.bottoms[i], y_coor)
+            self.tops[i] = max(self.tops[i], y_coor)
+            self.lines[i].setdefault(y_coor, []).append(item)
+            # A lower bottom may now bridge the gap to the next row down
+            while i > 0 and self.tops[i - 1] >= self.bottoms[i] - self.tolerance:
+                self.bottoms[i] = self.bottoms[i - 1]
+                self.lines[i - 1].update(self.lines[i])
+                self.lines[i] = self.lines[i - 1]
+                del self.bottoms[i - 1], self.tops[i - 1], self.lines[i - 1]
+                i -= 1
+        else:
+            self.bottoms.insert(i, y_coor)
+            self.tops.insert(i, y_coor)
+            self.lines.insert(i, {y_coor: [item]})
+
+    def rows(self):
+        """
+        Return each row as a list of (y coordinate, items) lines, rows and lines both ordered from the top of the page.
+        """
+        return [sorted(lines.items(), key=lambda line: line[0], reverse=True) for lines in reversed(self.lines)]
+
+    def flat_rows(self):
+        """
+        Return each row as a flat list of its items, rows ordered from the top of the page.
+        """
+        return [[item for y_coor, items in row for item in items] for row in self.rows()]
+
+
+@dataclass
+class Column:
+    """
+    One column of a statement table. Values belong to the column when their alignment edge (x0 for left aligned, x1
+    for right aligned) lies within tolerance of the same edge of the header; open_right columns instead take every
+    value that ends at or to the right of the header. parse turns a value into the fields it sets, raising ValueError
+    or decimal.InvalidOperation (or returning None) for text that is not a value of the column.
+    """
+    header: str
+    parse: Callable[[Any], Optional[dict]]
+    alignment: str = 'x0'
+    tolerance: float = 3
+    open_right: bool = False
+
+
+class ColumnLayout:
+    """
+    Classifies page elements into the columns declared for a statement format. Header positions are learnt as header
+    elements are seen; values are then matched against sorted header anchors with bisect instead of a chain of
+    coordinate comparisons per element. When multiple columns match, the one declared first wins.
+    """
+
+    def __init__(self, columns: List[Column], sub_header_offset: float = None, sub_header_tolerance: float = 2):
+        self.columns = columns
+        self.columns_by_header = {column.header: i for i, column in enumerate(columns)}
+        # Text on the line this far below the headers (e.g. 'Date' under 'Post') is part of the header
+        self.sub_header_offset = sub_header_offset
+        self.sub_header_tolerance = sub_header_tolerance
+        self.reset()
+
+    def reset(self):
+        self.sub_header_y_coor = None
+        self.anchors = {'x0': [], 'x1': []}
+        self.open_right_anchors = []
+
+    def match_header(self, text: str, element) -> bool:
+        i = self.columns_by_header.get(text)
+        if i is None:
+            return False
+        column = self.columns[i]
+        x_coor = getattr(element, column.alignment)
+        anchors = self.open_right_anchors if column.open_right else self.anchors[column.alignment]
+        # Replace the anchor of a header seen before (e.g. on a previous table)
+        anchors[:] = [anchor for anchor in anchors if anchor[1] != i]
+        insort(anchors, (x_coor, i))
+        if self.sub_header_offset is not None:
+            self.sub_header_y_coor = element.y0 - self.sub_header_offset
+        return True
+
+    def find_column(self, group) -> Optional[Column]:
+        if (self.sub_header_y_coor is not None and
+                abs(group.y0 - self.sub_header_y_coor) <= self.sub_header_tolerance):
+            return None
+
+        best = None
+        for alignment, anchors in self.anchors.items():
+            if not anchors:
+                continue
+            x_coor = getattr(group, alignment)
+            # Only the anchors either side of the coordinate can be within tolerance
+            j = bisect_left(anchors, (x_coor, -1))
+            for anchor_x_coor, i in anchors[max(j - 1, 0):j + 1]:
+                if abs(x_coor - anchor_x_coor) <= self.columns[i].tolerance and (best is None or i < best):
+                    best = i
+        if self.open_right_anchors:
+            # Every open right anchor at or left of the value's right edge matches
+            j = bisect_right(self.open_right_anchors, (group.x1, len(self.columns)))
+            for anchor_x_coor, i in self.open_right_anchors[:j]:
+                if best is None or i < best:
+                    best = i
+
+        return None if best is None else self.columns[best]
+
+    def parse(self, group) -> dict:
+        column = self.find_column(group)
+        if column is None:
+            return {}
+        try:
+            return column.parse(group) or {}
+        except (ValueError, decimal.InvalidOperation):
+            logging.debug(f'Text \'{group.text}\' in "{column.header}" column is not a valid value.')
+            return {}
+
+    def parse_row(self, groups) -> dict:
+        """
+        Classify a row of groups in one pass, learning headers on the way, and return the merged fields.
+        """
+        fields = {}
+        for group in groups:
+            if not self.match_header(group.text, group):
+                fields |= self.parse(group)
+        return fields
+
+
+def text_value(field: str):
+    return lambda group: {field: group.text}
+
+
+def decimal_value(field: str):
+    return lambda group: {field: Decimal(group.text.replace(',', ''))}
+
+
+def date_value(field: str, year: int):
+    return lambda group: {field: datetime.strptime(f'{group.text} {year}', '%d %b %Y')}
@@ -0,0 +1,107 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from document_consumer import synthetic
+from document_consumer.posb.account_parser import parse_posb_account_transactions
+from document_consumer.queries import assert_max_queries
+from document_consumer.resolver import resolver
+from document_consumer.synthetic import STATEMENT_FILE_NAME, \
+    count_holder_rows, \
+    count_rows, \
+    create_holder, \
+    create_snapshot, \
+    persist, \
+    persisted_snapshot, \
+    uob_account_arguments, \
+    uob_card_arguments
+from document_consumer.uob.account_parser import parse_uob_account_transactions
+from document_consumer.uob.card_parser import parse_uob_card_transactions
+
+
+class Command(BaseCommand):
+    help = ('Time the transaction parsers and the persistence step on synthetic statements. Every run is rolled back, '
+            'so the database is left as it was.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--instruments', type=int, default=3,
+                            help='Accounts on a UOB account statement and cards on a UOB card statement')
+        parser.add_argument('--transactions-per-page', type=int, default=40,
+                            help='Transactions per account or card on every page')
+        parser.add_argument('--pages', type=int, default=10, help='Transaction pages per statement')
+        parser.add_argument('--csv-rows', type=int, default=10000, help='Transactions in the POSB CSV export')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per benchmark, the fastest is reported')
+        parser.add_argument('--max-queries', type=int,
+                            help='Fail when a run of any benchmark makes more queries than this')
+
+    def handle(self, *args, **options):
+        instruments = options['instruments']
+        per_page = options['transactions_per_page']
+        pages = options['pages']
+        csv_rows = options['csv_rows']
+        account_pages = synthetic.uob_account_pages(instruments, per_page, pages)
+        card_pages = synthetic.uob_card_pages(instruments, per_page, pages)
+        posb_rows = synthetic.posb_rows(csv_rows)
+        transaction_dicts = synthetic.account_transaction_dicts(csv_rows)
+
+        # Name: (setup, timed run, count of the rows the run produced, rows expected)
+        benchmarks = {
+            'parse_uob_account_transactions': (lambda: uob_account_arguments(account_pages),
+                                               lambda arguments: parse_uob_account_transactions(*arguments),
+                                               lambda arguments, result: count_rows(result),
+                                               instruments * per_page * pages),
+            'parse_uob_card_transactions': (lambda: uob_card_arguments(card_pages),
+                                            lambda arguments: parse_uob_card_transactions(*arguments),
+                                            lambda arguments, result: count_rows(result),
+                                            instruments * per_page * pages),
+            'parse_posb_account_transactions': (lambda: (STATEMENT_FILE_NAME, create_holder(), 'SGD', posb_rows),
+                                                lambda arguments: parse_posb_account_transactions(*arguments),
+                                                lambda arguments, result: count_holder_rows(arguments[1]),
+                                                csv_rows),
+            'TransactionBuffer insert': (lambda: (create_snapshot(), transaction_dicts),
+                                         lambda arguments: persist(*arguments),
+                                         lambda arguments, result: count_rows(result),
+                                         csv_rows),
+            'TransactionBuffer upsert': (lambda: (persisted_snapshot(transaction_dicts), transaction_dicts),
+                                         lambda arguments: persist(*arguments),
+                                         lambda arguments, result: count_rows(result),
+                                         csv_rows)
+        }
+        for name, (setup, run, count, expected_rows) in benchmarks.items():
+            try:
+                rows, fastest, queries = self.measure(setup, run, count, options['repeat'], options['max_queries'])
+            except AssertionError as e:
+                raise CommandError(f'{name} made {e}')
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(f'  {rows} rows in {fastest * 1000:.1f} ms '
+                              f'({rows / fastest if fastest else float("inf"):,.0f} rows/s)')
+            self.stdout.write(f'  {queries.count} queries, {queries.seconds * 1000:.1f} ms in the database')
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  {queries.breakdown()}')
+            if rows != expected_rows:
+                self.stderr.write(self.style.WARNING(f'  expected {expected_rows} rows'))
+
+    @staticmethod
+    def measure(setup, run, count, repeat: int, max_queries: int = None):
+        """
+        Run setup then time run, repeat times, each in a transaction that is rolled back afterwards. Returns the rows
+        and queries of the last run and the fastest time. Raises AssertionError when a run makes more than
+        max_queries queries.
+        """
+        fastest = None
+        rows = None
+        queries = None
+        for _ in range(repeat):
+            with transaction.atomic():
+                arguments = setup()
+                with assert_max_queries(max_queries if max_queries is not None else float('inf')) as queries:
+                    start = time.perf_counter()
+                    result = run(arguments)
+                    elapsed = time.perf_counter() - start
+                rows = count(arguments, result)
+                transaction.set_rollback(True)
+            # Entities created by the rolled back run must not be handed out again
+            resolver.invalidate()
+            fastest = elapsed if fastest is None else min(fastest, elapsed)
+        return rows, fastest, queries
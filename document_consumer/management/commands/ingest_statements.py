@@ -0,0 +1,75 @@
+import os
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from components.models import InstrumentHolder
+from document_consumer.jobs import JobRunner, enqueue_job
+from document_consumer.models import IngestionJob
+from document_consumer.resolver import resolver
+from document_consumer.services import SUPPORTED_EXTENSIONS
+from document_consumer.timing import BatchTiming, timing_enabled
+
+
+class Command(BaseCommand):
+    help = 'Parse every statement in a directory. Extraction runs in a process pool; this process is the only writer.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', type=Path)
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Number of extraction processes (default: number of CPUs)')
+        parser.add_argument('--force', action='store_true',
+                            help='Re-ingest files whose contents were already ingested')
+        parser.add_argument('--holder', type=int,
+                            help='Id of the instrument holder of statements that do not name theirs, e.g. CSV exports')
+        parser.add_argument('--timings', action='store_true',
+                            help='Log stage timings per file and summarise them at the end (default: INGESTION_TIMING)')
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        if not directory.is_dir():
+            raise CommandError(f'{directory} is not a directory')
+        holder = None
+        if options['holder'] is not None:
+            holder = InstrumentHolder.objects.filter(pk=options['holder']).first()
+            if holder is None:
+                raise CommandError(f'Instrument holder {options["holder"]} does not exist')
+
+        files = sorted(file for file in directory.iterdir()
+                       if file.is_file() and file.suffix.casefold() in SUPPORTED_EXTENSIONS)
+        start = time.perf_counter()
+        # Reference entities are resolved at most once per run
+        resolver.invalidate()
+
+        # Every file becomes a job, so failures are recorded and retried without holding up the rest of the batch
+        job_ids = [enqueue_job(file, force=options['force'], holder=holder).pk for file in files]
+        timing = BatchTiming() if options['timings'] or timing_enabled() else None
+        JobRunner(options['workers'], on_finished=self.report, timing=timing).run(job_ids)
+
+        states = dict.fromkeys(IngestionJob.State, 0) | {
+            state: count for state, count in IngestionJob.objects.filter(pk__in=job_ids)
+                                                                 .values_list('state')
+                                                                 .annotate(count=Count('pk'))}
+        elapsed = time.perf_counter() - start
+        throughput = len(files) / elapsed if elapsed else 0.0
+        self.stdout.write(f'{states[IngestionJob.State.SUCCEEDED]} succeeded, {states[IngestionJob.State.FAILED]} '
+                          f'failed, {states[IngestionJob.State.SKIPPED]} skipped out of {len(files)} files '
+                          f'in {elapsed:.1f}s ({throughput:.2f} files/s)')
+        if timing is not None and timing.files:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'Stage timings of {timing.files} ingested files'))
+            self.stdout.write('\n'.join(timing.summary()))
+
+    def report(self, job):
+        file_name = Path(job.file_path).name
+        match job.state:
+            case IngestionJob.State.SUCCEEDED:
+                self.stdout.write(self.style.SUCCESS(f'OK     {file_name}'))
+            case IngestionJob.State.SKIPPED:
+                self.stdout.write(f'SKIP   {file_name}')
+            case IngestionJob.State.QUEUED:
+                self.stderr.write(self.style.WARNING(f'RETRY  {file_name} at {job.available_at:%H:%M:%S}: '
+                                                     f'{job.error.strip().splitlines()[-1]}'))
+            case IngestionJob.State.FAILED:
+                self.stderr.write(self.style.ERROR(f'FAILED {file_name}: {job.error.strip().splitlines()[-1]}'))
@@ -0,0 +1,29 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from document_consumer.jobs import JobRunner
+from document_consumer.timing import BatchTiming, timing_enabled
+
+
+class Command(BaseCommand):
+    help = 'Run queued ingestion jobs until interrupted. Any number of these may run against the same queue.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Number of extraction processes (default: number of CPUs)')
+        parser.add_argument('--timings', action='store_true',
+                            help='Log stage timings per file and summarise them on exit (default: INGESTION_TIMING)')
+
+    def handle(self, *args, **options):
+        timing = BatchTiming() if options['timings'] or timing_enabled() else None
+        runner = JobRunner(options['workers'], on_finished=self.report, timing=timing)
+        try:
+            runner.run()
+        except KeyboardInterrupt:
+            runner.stop()
+        if timing is not None and timing.files:
+            self.stdout.write('\n'.join(timing.summary()))
+
+    def report(self, job):
+        self.stdout.write(f'{job.state:<10} {job.file_path}')
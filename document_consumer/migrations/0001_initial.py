@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-17 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestedFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, unique=True, verbose_name='SHA-256 of file contents')),
+                ('file_path', models.CharField(max_length=1024)),
+                ('size', models.PositiveBigIntegerField()),
+                ('modified_time', models.FloatField(verbose_name='last modification time')),
+                ('ingested_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'project_ingested_file',
+                'indexes': [models.Index(fields=['file_path', 'size', 'modified_time'], name='ingested_file_stat_idx')],
+            },
+        ),
+    ]
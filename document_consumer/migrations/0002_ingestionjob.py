@@ -0,0 +1,37 @@
+# Generated by Django 5.0.6 on 2026-10-17 17:49
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('document_consumer', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_path', models.CharField(max_length=1024)),
+                ('content_hash', models.CharField(max_length=64, null=True, verbose_name='SHA-256 of file contents')),
+                ('force', models.BooleanField(default=False, verbose_name='re-ingest known contents')),
+                ('state', models.CharField(choices=[('QUEUED', 'Queued'), ('EXTRACTING', 'Extracting'), ('PERSISTING', 'Persisting'), ('SUCCEEDED', 'Succeeded'), ('FAILED', 'Failed'), ('SKIPPED', 'Skipped')], default='QUEUED', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='earliest time of the next attempt')),
+                ('claimed_by', models.CharField(max_length=255, null=True)),
+                ('claimed_at', models.DateTimeField(null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(null=True, verbose_name='start of the first attempt')),
+                ('finished_at', models.DateTimeField(null=True)),
+                ('error', models.TextField(null=True, verbose_name='error of the last failed attempt')),
+            ],
+            options={
+                'db_table': 'project_ingestion_job',
+                'indexes': [models.Index(fields=['state', 'available_at'], name='ingestion_job_claim_idx')],
+            },
+        ),
+    ]
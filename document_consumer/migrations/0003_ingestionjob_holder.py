@@ -0,0 +1,20 @@
+# Generated by Django 5.0.6 on 2026-10-17 18:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('components', '0006_transaction_page_indexes'),
+        ('document_consumer', '0002_ingestionjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestionjob',
+            name='holder',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='components.instrumentholder'),
+        ),
+    ]
@@ -1,3 +1,51 @@
 from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 
-# Create your models here.
+from components.models import InstrumentHolder, LoggableModel
+
+
+class IngestedFile(LoggableModel):
+    content_hash = models.CharField('SHA-256 of file contents', max_length=64, unique=True)
+    file_path = models.CharField(max_length=1024)
+    size = models.PositiveBigIntegerField()
+    modified_time = models.FloatField('last modification time')
+    ingested_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'project_ingested_file'
+        indexes = [
+            models.Index(name='ingested_file_stat_idx', fields=['file_path', 'size', 'modified_time'])
+        ]
+
+
+class IngestionJob(LoggableModel):
+    class State(models.TextChoices):
+        QUEUED = 'QUEUED', _('Queued')
+        EXTRACTING = 'EXTRACTING', _('Extracting')
+        PERSISTING = 'PERSISTING', _('Persisting')
+        SUCCEEDED = 'SUCCEEDED', _('Succeeded')
+        FAILED = 'FAILED', _('Failed')
+        SKIPPED = 'SKIPPED', _('Skipped')
+
+    file_path = models.CharField(max_length=1024)
+    content_hash = models.CharField('SHA-256 of file contents', max_length=64, null=True)
+    force = models.BooleanField('re-ingest known contents', default=False)
+    # Owner of statements that do not name theirs, such as CSV exports
+    holder = models.ForeignKey(InstrumentHolder, null=True, on_delete=models.SET_NULL)
+    state = models.CharField(max_length=10, choices=State, default=State.QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    available_at = models.DateTimeField('earliest time of the next attempt', default=timezone.now)
+    claimed_by = models.CharField(max_length=255, null=True)
+    claimed_at = models.DateTimeField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField('start of the first attempt', null=True)
+    finished_at = models.DateTimeField(null=True)
+    error = models.TextField('error of the last failed attempt', null=True)
+
+    class Meta:
+        db_table = 'project_ingestion_job'
+        indexes = [
+            models.Index(name='ingestion_job_claim_idx', fields=['state', 'available_at'])
+        ]
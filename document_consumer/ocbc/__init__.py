@@ -0,0 +1,33 @@
+from components.models import Statement
+from document_consumer.fingerprint import last_page_text
+from document_consumer.registry import StatementParser, register
+
+OCBC = 'OCBC'
+
+OCBC_CARD_LAST_PAGE_TEXT = 'Only requests from Principal Cardmembers are accepted.'
+
+
+def detect_ocbc_text(file_name, first_page_text: str):
+    if not first_page_text.startswith('OCBC Bank'):
+        return None
+    if 'STATEMENT OF ACCOUNT' in first_page_text:
+        return Statement.InstrumentType.ACCOUNT
+    # Card statements only say so on their last page
+    if OCBC_CARD_LAST_PAGE_TEXT in last_page_text(file_name):
+        return Statement.InstrumentType.CARD
+    return None
+
+
+def detect_ocbc_pages(pages):
+    first_page_elements = pages[0].elements
+    if first_page_elements[0].get_text() != 'OCBC Bank':
+        return None
+    if first_page_elements[9].get_text() == 'STATEMENT OF ACCOUNT':
+        return Statement.InstrumentType.ACCOUNT
+    elif pages[-1].elements[-3].get_text().endswith(OCBC_CARD_LAST_PAGE_TEXT):
+        return Statement.InstrumentType.CARD
+    return None
+
+
+register(StatementParser(OCBC, 'document_consumer.ocbc.factory.parse_extracted_ocbc_statement',
+                         pdf_text=detect_ocbc_text, pdf_pages=detect_ocbc_pages))
@@ -2,7 +2,6 @@ import re
 from datetime import datetime
 from typing import List
 
-from django.contrib.contenttypes.models import ContentType
 from pdf_reader.custom_dataclasses import ExtractedPage, ExtractedPdfElement
 
 from components.models import FinancialInstitution, \
@@ -11,11 +10,15 @@ from components.models import FinancialInstitution, \
     Statement, \
     Account, \
     InstrumentStatement
+from document_consumer.resolver import resolver
+from document_consumer.timing import span
 
 
 def parse_ocbc_account_statement(file_name, pages: List[ExtractedPage], fi: FinancialInstitution):
-    statement, account_element_index = parse_ocbc_account_metadata(file_name, pages[0], fi)
-    parse_ocbc_account_transactions(pages, statement, account_element_index)
+    with span('metadata'):
+        statement, account_element_index = parse_ocbc_account_metadata(file_name, pages[0], fi)
+    with span('transactions'):
+        parse_ocbc_account_transactions(pages, statement, account_element_index)
 
 
 def parse_ocbc_account_metadata(file_name, first_page: ExtractedPage, fi: FinancialInstitution):
@@ -25,10 +28,12 @@ def parse_ocbc_account_metadata(file_name, first_page: ExtractedPage, fi: Financ
 
     # Instrument holder address
     holder_address_text = ' '.join([' '.join([word.capitalize() for word in row.split(' ')]) for row in holder_info])
-    holder_address, holder_address_created = Address.objects.get_or_create(full_address=holder_address_text)
+    holder_address, holder_address_created = resolver.get_or_create(Address, full_address=holder_address_text)
 
     # Instrument holder name
-    holder, holder_created = InstrumentHolder.objects.get_or_create(full_name=holder_name_text, address=holder_address)
+    holder, holder_created = resolver.get_or_create(InstrumentHolder,
+                                                    full_name=holder_name_text,
+                                                    address=holder_address)
 
     # Period
     account_element_index = None
@@ -54,7 +59,6 @@ def parse_ocbc_account_transactions(pages: List[ExtractedPage], statement: State
     account_numbers_with_transactions = {}
     is_end_of_transactions = False
     account_number_pattern = '^Account No. (\\d+)$'
-    account_ct = ContentType.objects.get_for_model(Account)
     last_account_statement = None
 
     for i, page in enumerate(pages):
@@ -76,16 +80,14 @@ def parse_ocbc_account_transactions(pages: List[ExtractedPage], statement: State
                 # Make account and account statement
                 account_number = match.group(1)
                 account_name = elements[j - 2].get_text()
-                account, account_created = Account.objects.get_or_create(name=account_name,
-                                                                         number=account_number,
-                                                                         holder=statement.holder,
-                                                                         provider=statement.provider)
+                account, account_created = resolver.get_or_create(Account, name=account_name,
+                                                                  number=account_number,
+                                                                  holder=statement.holder,
+                                                                  provider=statement.provider)
                 account_statement, account_statement_created = (InstrumentStatement.objects
-                                                                .get_or_create(instrument_content_type=account_ct,
-                                                                               instrument_id=account.id,
-                                                                               statement=statement))
+                                                                .get_or_create(account=account, statement=statement))
                 last_account_statement = account_statement
-
+            j += 1
 
         if is_end_of_transactions:
             break
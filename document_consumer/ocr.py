@@ -0,0 +1,81 @@
+import hashlib
+import os
+import pickle
+import zlib
+from pathlib import Path
+
+import pytesseract.pytesseract as tesseract
+from django.conf import settings
+
+from document_consumer.extraction_cache import evict_extraction_cache
+from document_consumer.timing import count, span
+
+OCR_CACHE_FILE_SUFFIX = '.ocr'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# The uncached call, every image_to_* function of pytesseract goes through it
+run_and_get_output = tesseract.run_and_get_output
+
+
+def configure_ocr(thread_limit: int = None):
+    """
+    Point pytesseract at TESSERACT_CMD and put the OCR cache in front of it, for whichever pages pdf_reader hands to
+    tesseract in this process. thread_limit caps the threads of each tesseract run, for extractions that share the
+    cores with others; without it tesseract uses its default. The pool processes running extractions are reused, so
+    the limit is set or cleared on every call rather than left over from an earlier statement.
+    """
+    tesseract.tesseract_cmd = settings.TESSERACT_CMD
+    tesseract.run_and_get_output = cached_run_and_get_output
+    # Read by tesseract's OpenMP runtime, pytesseract passes this process's environment on
+    if thread_limit is not None:
+        os.environ['OMP_THREAD_LIMIT'] = str(thread_limit)
+    else:
+        os.environ.pop('OMP_THREAD_LIMIT', None)
+
+
+def cached_run_and_get_output(image, extension='', lang=None, config='', nice=0, timeout=0, return_bytes=False):
+    """
+    run_and_get_output backed by an on-disk cache keyed by the rendered page image, the tesseract options and the
+    tesseract version. A page whose image is unchanged is never OCRed twice, even when its statement is extracted again
+    after a pdf_reader upgrade invalidated the extraction cache.
+    """
+    cache_dir = Path(settings.OCR_CACHE_DIR)
+    cache_file = cache_dir / f'{ocr_cache_key(image, extension, lang, config, return_bytes)}{OCR_CACHE_FILE_SUFFIX}'
+    try:
+        with open(cache_file, 'rb') as file:
+            output = pickle.loads(zlib.decompress(file.read()))
+        # Bump mtime so eviction sees this entry as recently used
+        os.utime(cache_file)
+        count(ocr_cache_hits=1)
+        return output
+    except (FileNotFoundError, pickle.UnpicklingError, zlib.error, EOFError):
+        pass
+
+    count(ocr_cache_misses=1)
+    with span('ocr'):
+        output = run_and_get_output(image, extension, lang, config, nice, timeout, return_bytes)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # Write then rename so concurrent workers never read a partial entry
+    temp_file = cache_file.with_suffix(f'.{os.getpid()}.tmp')
+    with open(temp_file, 'wb') as file:
+        file.write(zlib.compress(pickle.dumps(output, protocol=pickle.HIGHEST_PROTOCOL)))
+    os.replace(temp_file, cache_file)
+    evict_extraction_cache(cache_dir, settings.OCR_CACHE_MAX_BYTES, OCR_CACHE_FILE_SUFFIX)
+
+    return output
+
+
+def ocr_cache_key(image, *options) -> str:
+    sha256 = hashlib.sha256()
+    if isinstance(image, str):
+        # pytesseract passes image files to tesseract as they are
+        with open(image, 'rb') as file:
+            while chunk := file.read(HASH_CHUNK_SIZE):
+                sha256.update(chunk)
+    else:
+        # The pixels tesseract will be given, whatever the image object was
+        image, extension = tesseract.prepare(image)
+        sha256.update(f'{image.mode} {image.size}'.encode())
+        sha256.update(image.tobytes())
+    sha256.update(repr((str(tesseract.get_tesseract_version()), *options)).encode())
+    return sha256.hexdigest()
@@ -0,0 +1,80 @@
+from typing import Type
+
+from components.models import Snapshot, Transaction
+from components.rollups import apply_rollup_deltas, rollup_contributions, stored_contributions, trailing_contributions
+from document_consumer.timing import count, span
+
+UPSERT_BATCH_SIZE = 500
+TRANSACTION_UNIQUE_FIELDS = ['snapshot', 'row_number']
+
+
+class TransactionBuffer:
+    """
+    Collects parsed transaction rows per snapshot and persists each snapshot's rows with one batched upsert keyed on
+    the (snapshot, row_number) unique constraint. With flush_size set, pending rows are
+    written whenever that many have been collected, so arbitrarily long inputs stream through in fixed-size chunks.
+    flush() is called once every row has been added.
+    """
+
+    def __init__(self, transaction_model: Type[Transaction], flush_size: int = None):
+        self.transaction_model = transaction_model
+        self.flush_size = flush_size
+        self.rows_by_snapshot = {}
+        self.pending_count = 0
+        # Row numbers continue across flushes
+        self.row_counts = {}
+        self.update_fields = [field.name for field in transaction_model._meta.concrete_fields
+                              if not field.primary_key and field.name not in TRANSACTION_UNIQUE_FIELDS]
+
+    def add(self, snapshot: Snapshot, transaction_dict: dict, row_number: int = None):
+        rows = self.rows_by_snapshot.setdefault(snapshot, [])
+        if row_number is None:
+            row_number = self.row_counts.get(snapshot, 0) + 1  # 1 begin list index
+        self.row_counts[snapshot] = max(self.row_counts.get(snapshot, 0), row_number)
+        if isinstance(transaction_dict.get('sub_description'), list):
+            transaction_dict['sub_description'] = '\n'.join(transaction_dict['sub_description'])
+        rows.append(self.transaction_model(snapshot=snapshot,
+                                           row_number=row_number,
+                                           **transaction_dict))
+        self.pending_count += 1
+        if self.flush_size is not None and self.pending_count >= self.flush_size:
+            with span('write'):
+                self.write()
+        return row_number
+
+    def flush(self):
+        """
+        Write the pending rows, then remove the stored rows numbered after the last row added for each snapshot, which
+        a re-ingested statement that parsed fewer rows no longer has.
+        """
+        with span('write'):
+            snapshot_to_transactions = self.write()
+            self.remove_trailing_rows()
+            return snapshot_to_transactions
+
+    def write(self):
+        snapshot_to_transactions = {}
+        for snapshot, rows in self.rows_by_snapshot.items():
+            # Rows that are upserted again stop counting towards the rollups with their old values
+            old_contributions = stored_contributions(self.transaction_model, snapshot, (row.row_number for row in rows))
+            snapshot_to_transactions[snapshot] = (self.transaction_model.objects
+                                                  .bulk_create(rows,
+                                                               batch_size=UPSERT_BATCH_SIZE,
+                                                               update_conflicts=True,
+                                                               unique_fields=TRANSACTION_UNIQUE_FIELDS,
+                                                               update_fields=self.update_fields))
+            apply_rollup_deltas(self.transaction_model, snapshot, old_contributions,
+                                rollup_contributions(self.transaction_model, rows))
+        count(rows=self.pending_count)
+        self.rows_by_snapshot = {}
+        self.pending_count = 0
+
+        return snapshot_to_transactions
+
+    def remove_trailing_rows(self):
+        for snapshot, last_row_number in self.row_counts.items():
+            old_contributions = trailing_contributions(self.transaction_model, snapshot, last_row_number)
+            if old_contributions is None:
+                continue
+            self.transaction_model.objects.filter(snapshot=snapshot, row_number__gt=last_row_number).delete()
+            apply_rollup_deltas(self.transaction_model, snapshot, old_contributions, {})
@@ -0,0 +1,16 @@
+from typing import List
+
+from components.models import Statement
+from document_consumer.registry import StatementParser, register
+
+POSB = 'POSB'
+
+
+def detect_posb_rows(rows: List[list]):
+    if rows and len(rows[0]) > 1 and rows[0][1].startswith('POSB'):
+        return Statement.InstrumentType.ACCOUNT
+    return None
+
+
+register(StatementParser(POSB, 'document_consumer.posb.factory.parse_extracted_posb_statement',
+                         csv_rows=detect_posb_rows))
@@ -0,0 +1,16 @@
+from pathlib import Path
+
+from components.models import InstrumentHolder, Statement
+from document_consumer.csv_rows import read_csv_rows
+from document_consumer.posb.account_parser import parse_posb_account_transactions
+
+
+def parse_extracted_posb_statement(file_name,
+                                   pages: None,
+                                   statement_type: Statement.InstrumentType,
+                                   holder: InstrumentHolder = None):
+    if holder is None:
+        raise ValueError(f'{Path(file_name).name} does not name its holder, it has to be ingested with one')
+    # The export is streamed from the file, nothing of it was extracted beforehand
+    with open(file_name, 'r') as csvfile:
+        parse_posb_account_transactions(Path(file_name).stem, holder, 'SGD', read_csv_rows(csvfile))
@@ -0,0 +1,100 @@
+import logging
+import re
+import time
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# The table a statement reads or writes first, Django quotes table names
+STATEMENT_TABLE_PATTERN = re.compile(r'\b(?:FROM|INTO|UPDATE)\s+"([^"]+)"', re.IGNORECASE)
+OTHER_STATEMENTS = 'other'
+
+models_by_table = None
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryStats:
+    """
+    Query count and database time, in total and per model, of the queries run on a connection while installed as
+    its execute wrapper. Statements on tables without a model (e.g. the search index) count under the table name,
+    savepoints and other statements without a table under 'other'.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.by_model = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.seconds += elapsed
+            model_stats = self.by_model.setdefault(statement_model(sql), [0, 0.0])
+            model_stats[0] += 1
+            model_stats[1] += elapsed
+
+    def breakdown(self):
+        return ', '.join(f'{model} {count} ({seconds * 1000:.1f} ms)' for model, (count, seconds) in
+                         sorted(self.by_model.items(), key=lambda item: item[1][0], reverse=True))
+
+
+def statement_model(sql: str) -> str:
+    global models_by_table
+    if models_by_table is None:
+        models_by_table = {model._meta.db_table: model.__name__ for model in apps.get_models()}
+    match = STATEMENT_TABLE_PATTERN.search(sql)
+    if match is None:
+        return OTHER_STATEMENTS
+    return models_by_table.get(match.group(1), match.group(1))
+
+
+@contextmanager
+def tracking_queries(using: str = DEFAULT_DB_ALIAS):
+    """
+    Count the queries this thread runs on the connection until the block exits.
+    """
+    stats = QueryStats()
+    with connections[using].execute_wrapper(stats):
+        yield stats
+
+
+@contextmanager
+def assert_max_queries(max_queries: int, using: str = DEFAULT_DB_ALIAS):
+    """
+    Test helper: fail when the block runs more than max_queries queries, listing them per model. Unlike
+    assertNumQueries it holds an upper bound, so a parser that gets cheaper does not break its test.
+    """
+    with tracking_queries(using) as stats:
+        yield stats
+    if stats.count > max_queries:
+        raise AssertionError(f'{stats.count} queries, expected at most {max_queries}: {stats.breakdown()}')
+
+
+def check_query_budget(file_name, stats: QueryStats):
+    """
+    Compare the queries of a statement against INGESTION_QUERY_BUDGET and warn, or raise QueryBudgetExceeded when
+    INGESTION_QUERY_BUDGET_ACTION is 'fail'.
+    """
+    budget = settings.INGESTION_QUERY_BUDGET
+    if budget is None:
+        return
+    exceeded = []
+    if budget.get('queries') is not None and stats.count > budget['queries']:
+        exceeded.append(f'{stats.count} queries (budget {budget["queries"]})')
+    if budget.get('seconds') is not None and stats.seconds > budget['seconds']:
+        exceeded.append(f'{stats.seconds:.3f}s of database time (budget {budget["seconds"]}s)')
+    if not exceeded:
+        return
+    message = f'{file_name} exceeded its query budget with {" and ".join(exceeded)}: {stats.breakdown()}'
+    if settings.INGESTION_QUERY_BUDGET_ACTION == 'fail':
+        raise QueryBudgetExceeded(message)
+    logging.warning(message)
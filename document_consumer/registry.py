@@ -0,0 +1,87 @@
+from importlib import import_module
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from components.models import Statement
+from document_consumer.timing import span
+
+# What a predicate is given to look at: the text layer of the first PDF page (and the file name, to read more), the
+# fully extracted pages of a PDF without a text layer, or the first rows of a CSV export
+PDF_TEXT = 'pdf_text'
+PDF_PAGES = 'pdf_pages'
+CSV_ROWS = 'csv_rows'
+
+
+class StatementParser:
+    """
+    Detection and parsing of one bank's statements. Each predicate returns the statement type when it recognises a
+    file as the bank's, or None. parser is the dotted path of a function taking the file name, the extracted pages
+    (None for CSV exports), the statement type and the instrument holder given for the file, or None; statements that
+    name their holder ignore it. The module holding the function, and with it the bank's parsers, is only imported
+    once a statement of the bank is persisted.
+    """
+
+    def __init__(self, bank: str, parser: str, pdf_text: Callable = None, pdf_pages: Callable = None,
+                 csv_rows: Callable = None):
+        self.bank = bank
+        self.parser = parser
+        self.predicates = {PDF_TEXT: pdf_text, PDF_PAGES: pdf_pages, CSV_ROWS: csv_rows}
+        self.hits = 0
+        self.parse = None
+
+
+# Registered parsers, the most often detected in this process first
+parsers: List[StatementParser] = []
+parsers_by_bank: Dict[str, StatementParser] = {}
+packages_imported = False
+
+
+def register(parser: StatementParser):
+    """
+    Called by each bank package in STATEMENT_PARSER_PACKAGES when it is imported.
+    """
+    parsers.append(parser)
+    parsers_by_bank[parser.bank] = parser
+
+
+def registered_parsers() -> List[StatementParser]:
+    global packages_imported
+    if not packages_imported:
+        # Only the packages themselves, which hold the predicates and not the parsers
+        for package in settings.STATEMENT_PARSER_PACKAGES:
+            import_module(package)
+        packages_imported = True
+    return parsers
+
+
+def detect(kind: str, *args) -> Optional[Tuple[str, Statement.InstrumentType]]:
+    """
+    Return the bank and statement type from the first predicate of the given kind that recognises args, or None.
+    Predicates are tried in order of how often their bank has been detected, so the usual statements of a batch are
+    recognised by the first predicate tried.
+    """
+    for parser in registered_parsers():
+        predicate = parser.predicates.get(kind)
+        if predicate is None:
+            continue
+        statement_type = predicate(*args)
+        if statement_type is not None:
+            parser.hits += 1
+            # Stable, so banks detected equally often keep their registration order
+            parsers.sort(key=lambda registered: registered.hits, reverse=True)
+            return parser.bank, statement_type
+    return None
+
+
+def statement_parser(bank: str) -> Callable:
+    """
+    The parse function of a bank, imported on first use.
+    """
+    registered_parsers()
+    parser = parsers_by_bank[bank]
+    if parser.parse is None:
+        with span('import_parser'):
+            parser.parse = import_string(parser.parser)
+    return parser.parse
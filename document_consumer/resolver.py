@@ -0,0 +1,31 @@
+from typing import Type
+
+from django.db import models
+
+
+class EntityResolver:
+    """
+    Identity map for reference entities (addresses, institutions, holders, accounts, cards) that every statement in a
+    run resolves again. Each natural key hits the database at most once until it is invalidated.
+    """
+
+    def __init__(self):
+        self.entities = {}
+
+    def get_or_create(self, model: Type[models.Model], defaults: dict = None, **lookup):
+        key = (model, frozenset(lookup.items()))
+        if key in self.entities:
+            return self.entities[key], False
+        entity, created = model.objects.get_or_create(defaults=defaults, **lookup)
+        self.entities[key] = entity
+        return entity, created
+
+    def invalidate(self, model: Type[models.Model] = None):
+        if model is None:
+            self.entities = {}
+        else:
+            self.entities = {key: entity for key, entity in self.entities.items() if key[0] is not model}
+
+
+# Shared by the parsers for the lifetime of an ingestion run
+resolver = EntityResolver()
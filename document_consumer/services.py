@@ -1,41 +1,125 @@
-import csv
+import hashlib
+import logging
+import os
+from itertools import islice
 from pathlib import Path
 
 import django
-import pytesseract.pytesseract
-from pdf_reader import get_elements_from_pdf
+from django.db import transaction
 
 django.setup()
 
-from document_consumer.ocbc.factory import parse_ocbc_statement
-from document_consumer.uob.factory import parse_uob_statement
-from document_consumer.posb.account_parser import parse_posb_account_transactions
 from components.models import InstrumentHolder
+from document_consumer.csv_rows import read_csv_rows
+from document_consumer.extraction_cache import get_cached_elements_from_pdf
+from document_consumer.fingerprint import fingerprint_pdf, fingerprint_pages, fingerprint_csv
+from document_consumer.models import IngestedFile
+from document_consumer.ocr import configure_ocr
+from document_consumer.queries import check_query_budget, tracking_queries
+from document_consumer.registry import statement_parser
+from document_consumer.resolver import resolver
+from document_consumer.timing import FileTiming, count, record_seconds, recording, span, timing_enabled
 
+SUPPORTED_EXTENSIONS = ['.pdf', '.csv']
+HASH_CHUNK_SIZE = 1024 * 1024
 
-def parse_statement(file_name):
-    file = Path(file_name)
-    file_extension = file.suffix
-    file_stem = file.stem
-    pytesseract.pytesseract.tesseract_cmd = \
-        'C:\\Users\\AmideWing\\AppData\\Local\\Programs\\Tesseract-OCR\\tesseract.exe'
+
+def parse_statement(file_name, force=False, holder: InstrumentHolder = None):
+    with recording(FileTiming(file_name) if timing_enabled() else None) as file_timing:
+        with span('hash'):
+            already_ingested, content_hash = check_ingested(file_name)
+        if already_ingested and not force:
+            return
+        content_hash = content_hash or hash_file(file_name)
+        persist_statement(file_name, extract_statement(file_name, content_hash), holder)
+        record_ingested(file_name, content_hash)
+    if file_timing is not None:
+        file_timing.log()
+
+
+def check_ingested(file_name):
+    """
+    Return whether the file was ingested before, and its content hash when one had to be computed. An unchanged path,
+    size and mtime is trusted without reading the file; otherwise the contents are hashed so renamed or copied
+    statements are still recognised.
+    """
+    file_stat = os.stat(file_name)
+    if IngestedFile.objects.filter(file_path=str(Path(file_name).resolve()),
+                                   size=file_stat.st_size,
+                                   modified_time=file_stat.st_mtime).exists():
+        return True, None
+
+    content_hash = hash_file(file_name)
+    return IngestedFile.objects.filter(content_hash=content_hash).exists(), content_hash
+
+
+def record_ingested(file_name, content_hash=None):
+    file_stat = os.stat(file_name)
+    IngestedFile.objects.update_or_create(content_hash=content_hash or hash_file(file_name),
+                                          defaults={
+                                              'file_path': str(Path(file_name).resolve()),
+                                              'size': file_stat.st_size,
+                                              'modified_time': file_stat.st_mtime
+                                          })
+
+
+def hash_file(file_name):
+    sha256 = hashlib.sha256()
+    with open(file_name, 'rb') as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def extract_statement(file_name, content_hash=None, ocr_threads: int = None):
+    """
+    Identify and read the raw contents of a statement without touching the database. Safe to run in a worker process;
+    the result is handed to persist_statement in the process that owns the database connection. Unrecognised PDFs are
+    rejected from the text of their first page before the expensive extraction, and PDF pages come from the
+    extraction cache when the same contents were extracted before. ocr_threads caps the threads tesseract runs on.
+    """
+    file_extension = Path(file_name).suffix
+    configure_ocr(ocr_threads)
     match file_extension.casefold():
         case '.pdf':
-            pages = get_elements_from_pdf(file_name)
-            first_page_elements = pages[0].elements
-            first_page_first_line = first_page_elements[0].get_text()
-            first_page_last_line = first_page_elements[len(first_page_elements) - 1].get_text()
-            if first_page_first_line == 'OCBC Bank':
-                parse_ocbc_statement(file_stem, pages, first_page_elements[0:3])
-            elif first_page_last_line.startswith('United Overseas Bank Limited'):
-                parse_uob_statement(file_stem, pages, first_page_last_line.split(' • '))
+            with span('fingerprint'):
+                fingerprint = fingerprint_pdf(file_name)
+            with span('extract_pages'):
+                pages = get_cached_elements_from_pdf(file_name, content_hash or hash_file(file_name))
+            count(pages=len(pages), elements=sum(len(page.elements) for page in pages))
+            if fingerprint is None:
+                # Scanned statements have no text layer to fingerprint before extraction
+                with span('fingerprint'):
+                    fingerprint = fingerprint_pages(pages)
+            return fingerprint, pages
         case '.csv':
-            with open(file_name, 'r') as csvfile:
-                csvreader = csv.reader(csvfile)
-                collected_rows = [row for row in csvreader if row]
-
-            if collected_rows[0][1].startswith('POSB'):
-                parse_posb_account_transactions(file_stem, InstrumentHolder.objects.get(pk=1), 'SGD', collected_rows)
+            # Only the header is read here, the body is streamed by the parser in persist_statement
+            with span('fingerprint'), open(file_name, 'r') as csvfile:
+                rows = list(islice(read_csv_rows(csvfile), 1))
+                return fingerprint_csv(rows), None
+        case _:
+            raise ValueError(f'{file_name} is not a supported statement file')
 
 
-parse_statement('D:\\Projects\\transaction_collation\\statements\\rachael\\UOB\\eStatement_16487.838218466066.pdf')
+def persist_statement(file_name, extracted, holder: InstrumentHolder = None):
+    """
+    Write a statement and all of its transactions in one database transaction, so a statement that fails part way
+    leaves nothing behind and the whole write set is synced to disk once. The queries of the statement are counted
+    and held against INGESTION_QUERY_BUDGET. The parsers of the statement's bank are imported on its first statement.
+    holder owns statements that do not name theirs, such as CSV exports.
+    """
+    fingerprint, contents = extracted
+    parse = statement_parser(fingerprint.bank)
+    try:
+        with span('persist'), transaction.atomic(), tracking_queries() as queries:
+            # CSV exports are streamed from the file by their parser, nothing was extracted
+            parse(file_name, contents, fingerprint.statement_type, holder)
+            count(queries=queries.count)
+            record_seconds('database', queries.seconds)
+            logging.debug(f'{file_name}: {queries.count} queries: {queries.breakdown()}')
+            # Checked before the transaction commits, so a statement that fails its budget is rolled back
+            check_query_budget(file_name, queries)
+    except Exception:
+        # Entities created by the rolled back transaction must not be handed out again
+        resolver.invalidate()
+        raise
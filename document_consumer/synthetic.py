@@ -0,0 +1,503 @@
+import datetime
+import random
+from decimal import Decimal, InvalidOperation
+from types import SimpleNamespace
+from typing import List
+
+from pdf_reader.custom_dataclasses import BaseElementGroup, \
+    ExtractedPage, \
+    ExtractedPdfElement, \
+    ExtractedTable, \
+    PdfParagraph, \
+    PdfTextElement
+
+from components.models import Account, \
+    AccountSnapshot, \
+    AccountTransaction, \
+    FinancialInstitution, \
+    InstrumentHolder, \
+    InstrumentStatement, \
+    Statement
+from document_consumer.persistence import TransactionBuffer
+from document_consumer.resolver import resolver
+from document_consumer.uob.account_parser import parse_uob_account_metadata
+from document_consumer.uob.card_parser import parse_uob_card_metadata, parse_uob_card_statement_month
+
+# Layout metrics of the generated pages, in PDF points with y growing up the page
+CHAR_WIDTH = 5
+LINE_HEIGHT = 8
+PAGE_TOP = 780
+# Transactions are this far apart; their sub-description line sits just below, within the row tolerance of the
+# card parser but outside that of the account parser
+ROW_PITCH = 24
+SUB_ROW_OFFSET = 9
+# Far left of every table, where footers and end markers cannot be taken for table text
+MARGIN_X = 10
+
+HOLDER_NAME = 'JOHN TAN'
+HOLDER_ADDRESS = ['123 ORCHARD ROAD', '#12-34 ORCHARD TOWERS', 'SINGAPORE 238858']
+UOB_FI_INFORMATION = ('United Overseas Bank Limited • 80 Raffles Place UOB Plaza Singapore 048624 • '
+                      'Co. Reg. No. 193500026Z • GST Reg. No. MR-8500194-3 • www.uob.com.sg')
+UOB_END_OF_SUMMARY = ('----------------------------------------------------------------- End of Summary----------'
+                      '--------------------------------------------------')
+UOB_ACCOUNT_END_OF_TRANSACTIONS = ('------------------------------------------------------------ End of Transaction '
+                                   'Details-------------------------------------------------------')
+UOB_CARD_END_OF_TRANSACTIONS = ('-------------------------------------------------- End of Transaction Details '
+                                '-----------------------------------------------------')
+ACCOUNT_NAMES = ['One Account', 'Stash Account', 'Lady\'s Savings Account']
+CARD_NAMES = ['UOB ONE CARD', 'PRVI MILES VISA', 'UOB ABSOLUTE CASHBACK']
+MERCHANTS = ['NTUC FAIRPRICE', 'GRAB TRANSPORT', 'SHOPEE SINGAPORE', 'KOPITIAM', 'SP DIGITAL', 'COLD STORAGE',
+             'BUS/MRT', 'GIRO PAYMENT', 'FUNDS TRANSFER', 'NETS QR PAYMENT']
+
+
+def build(cls, text: str = None, /, **attributes):
+    """
+    An instance of a pdf_reader class holding only the attributes the parsers read. The constructor is bypassed as
+    its signature is internal to pdf_reader; get_text answers with text when it is given.
+    """
+    instance = cls.__new__(cls)
+    vars(instance).update(attributes)
+    if text is not None:
+        vars(instance)['get_text'] = lambda: text
+    return instance
+
+
+def text_group(text: str, y0: float, x0: float = None, x1: float = None) -> BaseElementGroup:
+    """
+    A line of words starting at x0, or ending at x1 for right aligned text.
+    """
+    width = len(text) * CHAR_WIDTH
+    x0 = x1 - width if x0 is None else x0
+    words = []
+    word_x0 = x0
+    for word in text.split(' '):
+        words.append(build(PdfTextElement, text=word, x0=word_x0, x1=word_x0 + len(word) * CHAR_WIDTH,
+                           y0=y0, y1=y0 + LINE_HEIGHT))
+        word_x0 += (len(word) + 1) * CHAR_WIDTH
+    return build(BaseElementGroup, text, elements=words, text=text, x0=x0, x1=x0 + width, y0=y0, y1=y0 + LINE_HEIGHT)
+
+
+def text_element(text: str, y0: float, x0: float = None, x1: float = None) -> ExtractedPdfElement:
+    group = text_group(text, y0, x0, x1)
+    return build(ExtractedPdfElement, text, el=group, x0=group.x0, x1=group.x1, y0=group.y0, y1=group.y1)
+
+
+def table_item(groups: List[BaseElementGroup], values: List[BaseElementGroup] = ()):
+    return SimpleNamespace(el=groups[0],
+                           base_element_groups=groups,
+                           values=[SimpleNamespace(val=value.text, val_clean=clean_value(value.text), el=value)
+                                   for value in values])
+
+
+def table(items: list) -> ExtractedTable:
+    groups = [group for item in items for group in [*item.base_element_groups, *(value.el for value in item.values)]]
+    area = SimpleNamespace(x0=min(group.x0 for group in groups), x1=max(group.x1 for group in groups),
+                           y0=min(group.y0 for group in groups), y1=max(group.y1 for group in groups))
+    return table_with_area(items, area)
+
+
+def table_with_area(items: list, area: SimpleNamespace) -> ExtractedTable:
+    text = '\n'.join(' '.join(group.text for group in [*item.base_element_groups, *(value.el for value in item.values)])
+                     for item in items)
+    return build(ExtractedTable, text, items=items, table_area=area, x0=area.x0, x1=area.x1, y0=area.y0, y1=area.y1)
+
+
+def paragraph(lines: List[ExtractedPdfElement]) -> PdfParagraph:
+    text = '\n'.join(line.get_text() for line in lines)
+    return build(PdfParagraph, text, elements=lines, text=text, line_break_char='\n',
+                 x0=min(line.x0 for line in lines), x1=max(line.x1 for line in lines),
+                 y0=min(line.y0 for line in lines), y1=max(line.y1 for line in lines))
+
+
+def page(elements: list, paragraphs: list = ()) -> ExtractedPage:
+    return build(ExtractedPage, elements=elements, paragraphs=list(paragraphs))
+
+
+def clean_value(text: str):
+    try:
+        return Decimal(text.replace(',', ''))
+    except InvalidOperation:
+        return None
+
+
+def money(value: Decimal):
+    return f'{value:,.2f}'
+
+
+def random_amount(rng: random.Random, high: int = 50000):
+    return Decimal(rng.randrange(1, high)) / 100
+
+
+def uob_account_pages(accounts: int = 2,
+                      transactions_per_page: int = 30,
+                      pages: int = 3,
+                      statement_date: datetime.date = datetime.date(2024, 1, 31),
+                      seed: int = 0) -> List[ExtractedPage]:
+    """
+    A UOB account statement: an overview of the accounts on the first page, then a table per account on every page
+    with transactions_per_page transactions each, and a page of terms after the end of the transaction details.
+    """
+    rng = random.Random(seed)
+    account_numbers = [f'{100 + i}-{300 + i}-{500 + i}-{i % 10}' for i in range(accounts)]
+    balances = [random_amount(rng, 5000000) for _ in range(accounts)]
+
+    # Account overview, one row per account joined to its details paragraph by y coordinate
+    overview_header_y = 640
+    overview_items = [table_item([text_group('Account Type', overview_header_y, x0=40),
+                                  text_group('Currency', overview_header_y, x0=300),
+                                  text_group('Balance', overview_header_y, x1=420),
+                                  text_group('Credit Line', overview_header_y, x1=520)])]
+    account_paragraphs = []
+    for i, account_number in enumerate(account_numbers):
+        y_coor = overview_header_y - (i + 1) * ROW_PITCH
+        overview_items.append(table_item([text_group('SGD', y_coor, x0=300), text_group('0.00', y_coor, x1=520)],
+                                         [text_group(money(balances[i]), y_coor, x1=420)]))
+        account_paragraphs.append(paragraph([text_element('Savings', y_coor + LINE_HEIGHT, x0=40),
+                                             text_element(ACCOUNT_NAMES[i % len(ACCOUNT_NAMES)], y_coor, x0=40),
+                                             text_element(account_number, y_coor - LINE_HEIGHT, x0=40)]))
+    overview_table = table(overview_items)
+
+    holder_element = text_element(f'MR {HOLDER_NAME}', PAGE_TOP, x0=40)
+    title_element = text_element('Statement of Account', PAGE_TOP, x0=350)
+    address_element = text_element(HOLDER_ADDRESS[0], PAGE_TOP - 12, x0=40)
+    address_table = table([table_item([text_group(line, PAGE_TOP - 12 * (i + 2), x0=40),
+                                       text_group('Call', PAGE_TOP - 12 * (i + 2), x0=350)])
+                           for i, line in enumerate(HOLDER_ADDRESS[1:])])
+    overview_element = text_element(f'Account Overview as at {statement_date:%d %b %Y}', 680, x0=40)
+    category_elements = [text_element('Deposits', 664, x0=40), text_element('Deposits', 652, x0=40)]
+    first_page_elements = [holder_element, title_element, address_element, address_table, overview_element,
+                           overview_table, text_element(UOB_END_OF_SUMMARY, overview_table.y0 - 20, x0=MARGIN_X)]
+    first_page_paragraphs = [paragraph([holder_element]),
+                             paragraph([address_element]),
+                             paragraph([title_element]),
+                             paragraph([overview_element]),
+                             *(paragraph([element]) for element in category_elements),
+                             overview_table,
+                             *account_paragraphs]
+
+    result = []
+    for page_number in range(pages):
+        elements = first_page_elements if page_number == 0 else []
+        y_top = overview_table.y0 - 40 if page_number == 0 else PAGE_TOP
+        for i, account_number in enumerate(account_numbers):
+            table_elements, balances[i] = uob_account_table(rng, account_number, ACCOUNT_NAMES[i % len(ACCOUNT_NAMES)],
+                                                            y_top, transactions_per_page, statement_date, balances[i])
+            elements.extend(table_elements)
+            y_top = table_elements[0].y0 - 40
+        if page_number == pages - 1:
+            elements.append(text_element(UOB_ACCOUNT_END_OF_TRANSACTIONS, y_top, x0=MARGIN_X))
+        if page_number == 0:
+            elements.append(text_element(UOB_FI_INFORMATION, 20, x0=MARGIN_X))
+        result.append(page(elements, first_page_paragraphs if page_number == 0 else ()))
+    result.append(page([text_element('Terms and Conditions', PAGE_TOP, x0=40)]))
+    return result
+
+
+def uob_account_table(rng: random.Random,
+                      account_number: str,
+                      account_name: str,
+                      y_top: float,
+                      count: int,
+                      statement_date: datetime.date,
+                      balance: Decimal):
+    """
+    The transaction table of one account on one page, followed by the sub-description lines that pdf_reader leaves
+    outside the table. Returns the elements and the balance after the last transaction.
+    """
+    header_y = y_top - 16
+    items = [table_item([text_group(f'{account_number} {account_name}', y_top, x0=40)]),
+             table_item([text_group('Date', header_y, x0=40),
+                         text_group('Description', header_y, x0=90),
+                         text_group('Withdrawals', header_y, x1=400),
+                         text_group('Deposits', header_y, x1=480),
+                         text_group('Balance', header_y, x1=560)])]
+    sub_elements = []
+    for k in range(count):
+        y_coor = header_y - (k + 1) * ROW_PITCH
+        amount = random_amount(rng)
+        if rng.random() < 0.2:
+            balance += amount
+            amount_group = text_group(money(amount), y_coor, x1=480)
+        else:
+            balance -= amount
+            amount_group = text_group(money(amount), y_coor, x1=400)
+        date = statement_date.replace(day=rng.randrange(1, statement_date.day + 1))
+        items.append(table_item([text_group(f'{date:%d %b}', y_coor, x0=40),
+                                 text_group(rng.choice(MERCHANTS), y_coor, x0=90)],
+                                [amount_group, text_group(money(balance), y_coor, x1=560)]))
+        sub_elements.append(text_element(f'REF {rng.randrange(10 ** 8):08d}', y_coor - SUB_ROW_OFFSET, x0=90))
+    area = SimpleNamespace(x0=30, x1=570, y0=header_y - (count + 1) * ROW_PITCH, y1=y_top + LINE_HEIGHT)
+    return [table_with_area(items, area), *sub_elements], balance
+
+
+def uob_card_pages(cards: int = 2,
+                   transactions_per_page: int = 30,
+                   pages: int = 3,
+                   statement_date: datetime.date = datetime.date(2024, 1, 31),
+                   seed: int = 0) -> List[ExtractedPage]:
+    """
+    A UOB credit card statement: a summary of the cards on the first page, then a section per card on every page with
+    transactions_per_page transactions each, followed by the two payment pages the parser skips. The payment due
+    date on the last page puts the statement on statement_date.
+    """
+    rng = random.Random(seed)
+    card_numbers = [f'4265-8800-{1000 + i:04d}-{2000 + i:04d}' for i in range(cards)]
+    card_names = [CARD_NAMES[i % len(CARD_NAMES)] for i in range(cards)]
+
+    uob_element = text_element('UOB', PAGE_TOP, x0=40)
+    holder_element = text_element(f'MR {HOLDER_NAME}', PAGE_TOP - 20, x0=40)
+    address_elements = [text_element(line, PAGE_TOP - 32 - 12 * i, x0=40) for i, line in enumerate(HOLDER_ADDRESS)]
+    title_element = text_element('Credit Card(s) Statement', PAGE_TOP, x0=350)
+    credit_table = table([table_item([text_group('Statement Date', 700, x0=350)],
+                                     [text_group(f'{statement_date:%d %b %Y}'.upper(), 700, x1=560)]),
+                          table_item([text_group('Total Credit Limit', 688, x0=350)],
+                                     [text_group('SGD 12,000.00', 688, x1=560)])])
+
+    # Summary of the cards; the total row marks where it ends
+    summary_header_y = 620
+    summary_items = []
+    for i, (card_name, card_number) in enumerate(zip(card_names, card_numbers)):
+        y_coor = summary_header_y - (i + 1) * 20
+        summary_items.append(table_item([text_group(card_name, y_coor, x0=40),
+                                         text_group(card_number, y_coor, x0=200),
+                                         text_group(HOLDER_NAME, y_coor, x0=320)]))
+    summary_end_y = summary_header_y - (cards + 1) * 20
+    summary_items.append(table_item([text_group('Total', summary_end_y, x0=40)]))
+    # The parser reads the credit limit from the eighth element and the card summary from the eleventh on
+    first_page_elements = [uob_element, holder_element, *address_elements, title_element,
+                           text_element('Statement Summary', 712, x0=350),
+                           credit_table,
+                           text_element('Minimum Payment Due', 676, x0=350),
+                           text_element('Payment Due Date', 664, x0=350),
+                           text_element('Credit Card(s) Statement', 652, x0=40),
+                           text_element('Summary', 640, x0=40),
+                           text_element('Card Name', summary_header_y, x0=40),
+                           text_element('Card Number', summary_header_y, x0=200),
+                           text_element('Name on Card', summary_header_y, x0=320),
+                           table(summary_items),
+                           text_element('Transaction Details', summary_end_y - 20, x0=40)]
+    first_page_paragraphs = [paragraph([uob_element]),
+                             paragraph([holder_element, *address_elements]),
+                             paragraph([title_element])]
+
+    result = []
+    for page_number in range(pages):
+        elements = first_page_elements if page_number == 0 else []
+        y_top = summary_end_y - 60 if page_number == 0 else PAGE_TOP
+        for card_name, card_number in zip(card_names, card_numbers):
+            section = uob_card_section(rng, card_name, card_number, y_top, transactions_per_page, statement_date)
+            elements.extend(section)
+            y_top = section[-1].y0 - 40
+        if page_number == pages - 1:
+            elements.append(text_element(UOB_CARD_END_OF_TRANSACTIONS, y_top, x0=MARGIN_X))
+        if page_number == 0:
+            elements.append(text_element(UOB_FI_INFORMATION, 20, x0=MARGIN_X))
+        result.append(page(elements, first_page_paragraphs if page_number == 0 else ()))
+
+    due_date = statement_date + datetime.timedelta(days=21)
+    result.append(page([text_element('Payment Slip', PAGE_TOP, x0=40)]))
+    result.append(page([text_element(f'Please pay by {due_date:%d %b %Y}', PAGE_TOP, x0=40)]))
+    return result
+
+
+def uob_card_section(rng: random.Random,
+                     card_name: str,
+                     card_number: str,
+                     y_top: float,
+                     count: int,
+                     statement_date: datetime.date):
+    """
+    The transactions of one card on one page: the card heading, the column headers with their 'Date'/'SGD' line and
+    one element per value, each transaction followed by a reference line.
+    """
+    header_y = y_top - 30
+    sub_header_y = header_y - 8
+    elements = [text_element(card_name, y_top, x0=40),
+                text_element(f'{card_number} {HOLDER_NAME}', y_top - 12, x0=40),
+                text_element('Post', header_y, x0=40),
+                text_element('Trans', header_y, x0=90),
+                text_element('Description of Transaction', header_y, x0=140),
+                text_element('Transaction Amount', header_y, x1=560),
+                text_element('Date', sub_header_y, x0=40),
+                text_element('Date', sub_header_y, x0=90),
+                text_element('SGD', sub_header_y, x1=560)]
+    for k in range(count):
+        y_coor = header_y - 20 - k * ROW_PITCH
+        date = statement_date.replace(day=rng.randrange(1, statement_date.day))
+        post_date = date + datetime.timedelta(days=1)
+        amount = money(random_amount(rng))
+        elements.extend([text_element(f'{post_date:%d %b}', y_coor, x0=40),
+                         text_element(f'{date:%d %b}', y_coor, x0=90),
+                         text_element(rng.choice(MERCHANTS), y_coor, x0=140),
+                         text_element(f'{amount} CR' if rng.random() < 0.05 else amount, y_coor, x1=560),
+                         text_element(f'Ref No. : {rng.randrange(10 ** 12):012d}', y_coor - SUB_ROW_OFFSET, x0=140)])
+    return elements
+
+
+def ocbc_account_pages(accounts: int = 2,
+                       transactions_per_page: int = 30,
+                       pages: int = 3,
+                       statement_date: datetime.date = datetime.date(2024, 1, 31),
+                       seed: int = 0) -> List[ExtractedPage]:
+    """
+    An OCBC account statement with a section per account on every page, transactions_per_page transactions each,
+    ending at 'CHECK YOUR STATEMENT'.
+    """
+    rng = random.Random(seed)
+    account_numbers = [f'{501234567 + i}' for i in range(accounts)]
+    holder_element = text_element(HOLDER_NAME, 700, x0=40)
+    address_elements = [text_element(line, 688 - 12 * i, x0=40) for i, line in enumerate(HOLDER_ADDRESS)]
+    first_page_elements = [text_element('OCBC Bank', PAGE_TOP, x0=40),
+                           text_element('65 Chulia Street, OCBC Centre,', PAGE_TOP - 12, x0=40),
+                           text_element('Singapore 049513', PAGE_TOP - 24, x0=40),
+                           holder_element,
+                           *address_elements,
+                           text_element('Page 1', PAGE_TOP, x0=500),
+                           text_element('www.ocbc.com', PAGE_TOP - 12, x0=500),
+                           text_element('STATEMENT OF ACCOUNT', 640, x0=40)]
+    first_page_paragraphs = [paragraph(first_page_elements[:1]),
+                             paragraph(first_page_elements[1:3]),
+                             paragraph([holder_element, *address_elements])]
+    period = f'{statement_date.replace(day=1):%d %b %Y} TO {statement_date:%d %b %Y}'.upper()
+
+    result = []
+    for page_number in range(pages):
+        elements = first_page_elements if page_number == 0 else []
+        y_top = 620 if page_number == 0 else PAGE_TOP
+        for i, account_number in enumerate(account_numbers):
+            # The parser finds the account name two elements before its number
+            elements.extend([text_element(ACCOUNT_NAMES[i % len(ACCOUNT_NAMES)].upper(), y_top, x0=40),
+                             text_element(period if i == 0 and page_number == 0 else 'Singapore Dollar',
+                                          y_top - 12, x0=40),
+                             text_element(f'Account No. {account_number}', y_top - 24, x0=40),
+                             text_element('Transaction Date', y_top - 40, x0=40),
+                             text_element('Value Date', y_top - 40, x0=120),
+                             text_element('Description', y_top - 40, x0=200),
+                             text_element('Withdrawal', y_top - 40, x1=420),
+                             text_element('Deposit', y_top - 40, x1=490),
+                             text_element('Balance', y_top - 40, x1=560)])
+            balance = random_amount(rng, 5000000)
+            for k in range(transactions_per_page):
+                y_coor = y_top - 60 - k * ROW_PITCH
+                amount = random_amount(rng)
+                deposit = rng.random() < 0.2
+                balance += amount if deposit else -amount
+                date = statement_date.replace(day=rng.randrange(1, statement_date.day + 1))
+                elements.extend([text_element(f'{date:%d %b}'.upper(), y_coor, x0=40),
+                                 text_element(f'{date:%d %b}'.upper(), y_coor, x0=120),
+                                 text_element(rng.choice(MERCHANTS), y_coor, x0=200),
+                                 text_element(money(amount), y_coor, x1=490 if deposit else 420),
+                                 text_element(money(balance), y_coor, x1=560)])
+            y_top -= 80 + transactions_per_page * ROW_PITCH
+        if page_number == pages - 1:
+            elements.append(text_element('CHECK YOUR STATEMENT', y_top, x0=40))
+        result.append(page(elements, first_page_paragraphs if page_number == 0 else ()))
+    return result
+
+
+def posb_rows(transactions: int = 1000,
+              statement_date: datetime.date = datetime.date(2024, 1, 31),
+              seed: int = 0) -> List[list]:
+    """
+    The non-empty rows of a POSB account CSV export, as read_csv_rows yields them.
+    """
+    rng = random.Random(seed)
+    rows = [['Account Details For:', 'POSB Passbook Savings Account 123-45678-9'],
+            ['Statement as at:', f'{statement_date:%d %b %Y}'],
+            ['Available Balance:', f'{random_amount(rng, 5000000):.2f}'],
+            ['Ledger Balance:', f'{random_amount(rng, 5000000):.2f}'],
+            ['Transaction Date', 'Reference', 'Debit Amount', 'Credit Amount', 'Transaction Ref1',
+             'Transaction Ref2', 'Transaction Ref3']]
+    for _ in range(transactions):
+        date = statement_date.replace(day=rng.randrange(1, statement_date.day + 1))
+        amount = f'{random_amount(rng):.2f}'
+        deposit = rng.random() < 0.2
+        rows.append([f'{date:%d %b %Y}', 'ICT' if deposit else 'POS', '' if deposit else amount,
+                     amount if deposit else '', rng.choice(MERCHANTS), f'{rng.randrange(10 ** 8):08d}', ''])
+    return rows
+
+
+def account_transaction_dicts(transactions: int = 1000,
+                              statement_date: datetime.date = datetime.date(2024, 1, 31),
+                              seed: int = 0) -> List[dict]:
+    """
+    Parsed account transaction rows as the parsers hand them to TransactionBuffer.
+    """
+    rng = random.Random(seed)
+    rows = []
+    balance = random_amount(rng, 5000000)
+    for _ in range(transactions):
+        amount = random_amount(rng)
+        deposit = rng.random() < 0.2
+        balance += amount if deposit else -amount
+        rows.append({'date': statement_date.replace(day=rng.randrange(1, statement_date.day + 1)),
+                     'description': rng.choice(MERCHANTS),
+                     'sub_description': [f'REF {rng.randrange(10 ** 8):08d}'],
+                     'amount': None if deposit else amount,
+                     'deposits': amount if deposit else None,
+                     'balance': balance})
+    return rows
+
+
+# Database fixtures and parser arguments for the synthetic statements, shared by the tests and benchmark_parsers
+
+STATEMENT_FILE_NAME = 'synthetic'
+
+
+def uob_financial_institution():
+    fi, fi_created = resolver.get_or_create(FinancialInstitution, full_name='United Overseas Bank Limited',
+                                            abbreviation='UOB')
+    return fi
+
+
+def uob_account_arguments(pages: list):
+    account_snapshots, statement_year = parse_uob_account_metadata(STATEMENT_FILE_NAME, pages[0],
+                                                                   uob_financial_institution())
+    return pages, account_snapshots, statement_year
+
+
+def uob_card_arguments(pages: list):
+    statement_date = parse_uob_card_statement_month(pages[-1])
+    card_snapshots, summary_end_index, statement, currency, total_credit_limit = parse_uob_card_metadata(
+        STATEMENT_FILE_NAME,
+        statement_date,
+        pages[0],
+        uob_financial_institution())
+    return pages[:-2], card_snapshots, summary_end_index, statement, currency, total_credit_limit
+
+
+def count_rows(transactions_by_instrument: dict):
+    return sum(len(transactions) for transactions in transactions_by_instrument.values())
+
+
+def count_holder_rows(holder: InstrumentHolder):
+    return AccountTransaction.objects.filter(snapshot__instrument_statement__statement__holder=holder).count()
+
+
+def create_holder():
+    return InstrumentHolder.objects.create(full_name=HOLDER_NAME.title())
+
+
+def create_snapshot():
+    holder = create_holder()
+    fi = FinancialInstitution.objects.create(full_name='Synthetic Bank', abbreviation='SB')
+    account = Account.objects.create(holder=holder, provider=fi, name='Savings', number='0')
+    statement = Statement.objects.create(holder=holder, provider=fi, date=datetime.date(2024, 1, 31),
+                                         type=Statement.InstrumentType.ACCOUNT, file_name=STATEMENT_FILE_NAME)
+    instrument_statement = InstrumentStatement.objects.create(account=account, statement=statement)
+    return AccountSnapshot.objects.create(instrument_statement=instrument_statement, balance=0)
+
+
+def persisted_snapshot(transaction_dicts: list):
+    # Rows already stored, so persisting them again goes down the update path of the upsert
+    snapshot = create_snapshot()
+    persist(snapshot, transaction_dicts)
+    return snapshot
+
+
+def persist(snapshot: AccountSnapshot, transaction_dicts: list):
+    transaction_buffer = TransactionBuffer(AccountTransaction)
+    for transaction_dict in transaction_dicts:
+        # The buffer joins sub-description lists in place
+        transaction_buffer.add(snapshot, dict(transaction_dict))
+    return transaction_buffer.flush()
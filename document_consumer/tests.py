@@ -1,3 +1,208 @@
+import csv
+import os
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+
+from django.db import OperationalError
 from django.test import TestCase
+from django.utils import timezone
+
+from components.models import Account, AccountTransaction, CardTransaction, Statement
+from document_consumer import synthetic
+from document_consumer.fingerprint import Fingerprint, fingerprint_csv, fingerprint_pages
+from document_consumer.jobs import JobRunner, claim_job, enqueue_job, requeue_stale_jobs
+from document_consumer.layout import RowClusters
+from document_consumer.models import IngestionJob
+from document_consumer.ocr import configure_ocr
+from document_consumer.persistence import TransactionBuffer
+from document_consumer.posb.account_parser import parse_posb_account_transactions
+from document_consumer.queries import assert_max_queries
+from document_consumer.registry import statement_parser
+from document_consumer.resolver import resolver
+from document_consumer.synthetic import count_holder_rows, \
+    count_rows, \
+    create_holder, \
+    create_snapshot, \
+    persist, \
+    uob_account_arguments, \
+    uob_card_arguments
+from document_consumer.uob import detect_uob_text
+from document_consumer.uob.account_parser import parse_uob_account_transactions
+from document_consumer.uob.card_parser import parse_uob_card_transactions
+
+
+class ResolverTestCase(TestCase):
+    def setUp(self):
+        # Entities cached by a previous test were rolled back with it
+        resolver.invalidate()
+
+
+class ParserQueryCountTests(ResolverTestCase):
+    """
+    Queries of each transaction parser on the synthetic statements. Metadata is parsed outside the counted block, as
+    it is a fixed cost per statement.
+    """
+
+    def test_uob_account_transactions(self):
+        arguments = uob_account_arguments(synthetic.uob_account_pages(accounts=2, transactions_per_page=30, pages=3))
+        with assert_max_queries(14):
+            transactions = parse_uob_account_transactions(*arguments)
+        self.assertEqual(count_rows(transactions), 180)
+
+    def test_uob_card_transactions(self):
+        arguments = uob_card_arguments(synthetic.uob_card_pages(cards=2, transactions_per_page=30, pages=3))
+        with assert_max_queries(14):
+            transactions = parse_uob_card_transactions(*arguments)
+        self.assertEqual(count_rows(transactions), 180)
+
+    def test_posb_account_transactions(self):
+        holder = create_holder()
+        with assert_max_queries(35):
+            parse_posb_account_transactions('posb', holder, 'SGD', synthetic.posb_rows(1000))
+        self.assertEqual(count_holder_rows(holder), 1000)
+
+
+class SyntheticStatementTests(ResolverTestCase):
+    """
+    Each generated statement is recognised by fingerprinting and parsed back by its bank's parser.
+    """
+
+    def fingerprint_and_parse(self, pages):
+        fingerprint = fingerprint_pages(pages)
+        statement_parser(fingerprint.bank)(f'{synthetic.STATEMENT_FILE_NAME}.pdf', pages, fingerprint.statement_type)
+        return fingerprint
+
+    def test_uob_account_pages(self):
+        pages = synthetic.uob_account_pages(accounts=2, transactions_per_page=10, pages=2)
+        self.assertEqual(self.fingerprint_and_parse(pages), Fingerprint('UOB', Statement.InstrumentType.ACCOUNT))
+        self.assertEqual(AccountTransaction.objects.count(), 40)
+
+    def test_uob_card_pages(self):
+        pages = synthetic.uob_card_pages(cards=2, transactions_per_page=10, pages=2)
+        self.assertEqual(self.fingerprint_and_parse(pages), Fingerprint('UOB', Statement.InstrumentType.CARD))
+        self.assertEqual(CardTransaction.objects.count(), 40)
+
+    def test_ocbc_account_pages(self):
+        pages = synthetic.ocbc_account_pages(accounts=2, transactions_per_page=10, pages=2)
+        self.assertEqual(self.fingerprint_and_parse(pages), Fingerprint('OCBC', Statement.InstrumentType.ACCOUNT))
+        # The OCBC parser reads the accounts of a statement but not yet their transactions
+        self.assertEqual(set(Account.objects.values_list('number', flat=True)), {'501234567', '501234568'})
+
+    def write_posb_export(self, rows):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        file_name = Path(directory.name) / f'{synthetic.STATEMENT_FILE_NAME}.csv'
+        with open(file_name, 'w', newline='') as csvfile:
+            csv.writer(csvfile).writerows(rows)
+        return file_name
+
+    def test_posb_rows(self):
+        rows = synthetic.posb_rows(20)
+        fingerprint = fingerprint_csv(rows[:1])
+        self.assertEqual(fingerprint, Fingerprint('POSB', Statement.InstrumentType.ACCOUNT))
+        holder = create_holder()
+        statement_parser(fingerprint.bank)(self.write_posb_export(rows), None, fingerprint.statement_type, holder)
+        self.assertEqual(count_holder_rows(holder), 20)
+
+    def test_posb_export_needs_a_holder(self):
+        file_name = self.write_posb_export(synthetic.posb_rows(1))
+        with self.assertRaisesMessage(ValueError, 'does not name its holder'):
+            statement_parser('POSB')(file_name, None, Statement.InstrumentType.ACCOUNT, None)
+
+
+class DetectUobTextTests(TestCase):
+    def test_account_statement_with_card_offer(self):
+        text = ('Statement of Account Account Transaction Details One Account 123-456-789-0 Apply for a UOB '
+                'Credit Card(s) Statement today United Overseas Bank Limited')
+        self.assertEqual(detect_uob_text('statement.pdf', text), Statement.InstrumentType.ACCOUNT)
+
+    def test_card_statement(self):
+        text = 'Credit Card(s) Statement Statement Date 31 Jan 2024 United Overseas Bank Limited'
+        self.assertEqual(detect_uob_text('statement.pdf', text), Statement.InstrumentType.CARD)
+
+
+class TransactionBufferTests(ResolverTestCase):
+    def test_upsert_updates_stored_rows(self):
+        snapshot = create_snapshot()
+        rows = synthetic.account_transaction_dicts(20)
+        persist(snapshot, rows)
+        stored_pks = list(AccountTransaction.objects.order_by('row_number').values_list('pk', flat=True))
+
+        persist(snapshot, [row | {'description': f'UPDATED {i}'} for i, row in enumerate(rows)])
+
+        self.assertEqual(list(AccountTransaction.objects.order_by('row_number').values_list('pk', flat=True)),
+                         stored_pks)
+        self.assertEqual(list(AccountTransaction.objects.order_by('row_number').values_list('description', flat=True)),
+                         [f'UPDATED {i}' for i in range(20)])
+
+    def test_row_numbers_continue_across_flushes(self):
+        snapshot = create_snapshot()
+        transaction_buffer = TransactionBuffer(AccountTransaction, flush_size=3)
+        for row in synthetic.account_transaction_dicts(7):
+            transaction_buffer.add(snapshot, row)
+        transaction_buffer.flush()
+
+        self.assertEqual(list(AccountTransaction.objects.order_by('row_number').values_list('row_number', flat=True)),
+                         list(range(1, 8)))
+
+    def test_sub_description_lines_are_joined(self):
+        snapshot = create_snapshot()
+        persist(snapshot, [synthetic.account_transaction_dicts(1)[0] | {'sub_description': ['REF 1', 'SINGAPORE']}])
+        self.assertEqual(AccountTransaction.objects.get().sub_description, 'REF 1\nSINGAPORE')
+
+
+class RowClustersTests(TestCase):
+    def test_lines_within_tolerance_share_a_row(self):
+        row_clusters = RowClusters(3)
+        for y_coor, item in [(100, 'a'), (50, 'b'), (102, 'c'), (200, 'd'), (49, 'e')]:
+            row_clusters.add(y_coor, item)
+        self.assertEqual(row_clusters.flat_rows(), [['d'], ['c', 'a'], ['b', 'e']])
+
+    def test_line_between_rows_merges_them(self):
+        row_clusters = RowClusters(3)
+        for y_coor, item in [(100, 'a'), (106, 'b'), (90, 'c'), (103, 'd')]:
+            row_clusters.add(y_coor, item)
+        self.assertEqual(row_clusters.rows(), [[(106, ['b']), (103, ['d']), (100, ['a'])], [(90, ['c'])]])
+
+
+class IngestionJobTests(TestCase):
+    def setUp(self):
+        self.runner = JobRunner(workers=1)
+        enqueue_job('statement.pdf')
+        self.job = claim_job(self.runner.worker_id)
+
+    def claimed_long_ago(self):
+        IngestionJob.objects.filter(pk=self.job.pk).update(claimed_at=timezone.now() - timedelta(days=1))
+
+    def test_stale_job_is_requeued(self):
+        self.claimed_long_ago()
+        requeue_stale_jobs()
+        self.assertEqual(IngestionJob.objects.get(pk=self.job.pk).state, IngestionJob.State.QUEUED)
+
+    def test_heartbeat_keeps_slow_job_claimed(self):
+        self.claimed_long_ago()
+        self.runner.heartbeat([self.job])
+        requeue_stale_jobs()
+        self.assertEqual(IngestionJob.objects.get(pk=self.job.pk).state, IngestionJob.State.EXTRACTING)
+
+    def test_transient_failure_is_retried(self):
+        with self.assertLogs(level='WARNING'):
+            self.runner.fail(self.job, OperationalError('database is locked'))
+        self.assertEqual(IngestionJob.objects.get(pk=self.job.pk).state, IngestionJob.State.QUEUED)
+
+    def test_unrecognised_statement_fails_on_first_attempt(self):
+        with self.assertLogs(level='WARNING'):
+            self.runner.fail(self.job, ValueError('Rows are not from a recognised statement'))
+        job = IngestionJob.objects.get(pk=self.job.pk)
+        self.assertEqual((job.state, job.attempts), (IngestionJob.State.FAILED, 1))
+
 
-# Create your tests here.
+class ConfigureOcrTests(TestCase):
+    @mock.patch.dict(os.environ)
+    def test_thread_limit_is_cleared_for_the_next_statement(self):
+        configure_ocr(2)
+        self.assertEqual(os.environ['OMP_THREAD_LIMIT'], '2')
+        configure_ocr()
+        self.assertNotIn('OMP_THREAD_LIMIT', os.environ)
@@ -0,0 +1,130 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Timing of the statement being ingested in this thread, None while timing is off
+current_timing: ContextVar[Optional['FileTiming']] = ContextVar('current_timing', default=None)
+
+
+class FileTiming:
+    """
+    Stage timings and counts (pages, elements, rows) of one statement. Stages nest: a span opened inside another is
+    recorded as 'outer/inner', so the time of a stage includes that of its sub-stages. Plain data, so it can be
+    handed to an extraction worker process and back.
+    """
+
+    def __init__(self, file_name):
+        self.file_name = str(file_name)
+        self.seconds = {}
+        self.counts = {}
+        self.stack = []
+
+    def add_seconds(self, stage: str, seconds: float):
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    def add_counts(self, **counts: int):
+        for name, value in counts.items():
+            self.counts[name] = self.counts.get(name, 0) + value
+
+    def log(self):
+        fields = {'file': self.file_name} | {f'{stage}_s': round(seconds, 4) for stage, seconds in self.seconds.items()}
+        fields |= self.counts
+        logger.info(' '.join(f'{name}={value}' for name, value in fields.items()), extra={'timing': fields})
+
+
+class BatchTiming:
+    """
+    Stage timings and counts summed over the statements of a batch.
+    """
+
+    def __init__(self):
+        self.files = 0
+        self.seconds = {}
+        self.counts = {}
+
+    def add(self, file_timing: FileTiming):
+        self.files += 1
+        for stage, seconds in file_timing.seconds.items():
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+        for name, value in file_timing.counts.items():
+            self.counts[name] = self.counts.get(name, 0) + value
+
+    def summary(self):
+        """
+        One line per stage, in the order the stages first ran, with the total and the mean per statement, then the
+        counts.
+        """
+        lines = [f'{"stage":<40} {"total s":>10} {"mean ms":>10}']
+        for stage, seconds in self.seconds.items():
+            indent = '  ' * stage.count('/')
+            lines.append(f'{indent + stage.rsplit("/", 1)[-1]:<40} {seconds:>10.3f} '
+                         f'{seconds / self.files * 1000:>10.1f}')
+        lines.append(', '.join(f'{value} {name}' for name, value in self.counts.items()))
+        return lines
+
+
+def timing_enabled() -> bool:
+    return settings.INGESTION_TIMING
+
+
+@contextmanager
+def recording(file_timing: Optional[FileTiming]):
+    """
+    Record the spans and counts of this thread into file_timing until the block exits. None leaves timing off.
+    """
+    token = current_timing.set(file_timing)
+    try:
+        yield file_timing
+    finally:
+        current_timing.reset(token)
+
+
+@contextmanager
+def span(stage: str):
+    """
+    Time a stage of the statement being recorded. Costs a context variable lookup when nothing is recorded.
+    """
+    file_timing = current_timing.get()
+    if file_timing is None:
+        yield
+        return
+    file_timing.stack.append(stage)
+    path = '/'.join(file_timing.stack)
+    # Registered on entry so stages are listed in the order they start, each ahead of its sub-stages
+    file_timing.add_seconds(path, 0.0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        file_timing.add_seconds(path, time.perf_counter() - start)
+        file_timing.stack.pop()
+
+
+def record_seconds(stage: str, seconds: float):
+    """
+    Record time measured elsewhere, e.g. the database time of a stage, as a sub-stage of the current span.
+    """
+    file_timing = current_timing.get()
+    if file_timing is not None:
+        file_timing.add_seconds('/'.join([*file_timing.stack, stage]), seconds)
+
+
+def count(**counts: int):
+    file_timing = current_timing.get()
+    if file_timing is not None:
+        file_timing.add_counts(**counts)
+
+
+def call_recording(file_timing: Optional[FileTiming], function, *args):
+    """
+    Call function while recording into file_timing and return its result with the timing. Used to run a stage in a
+    worker process, where the timing is a pickled copy that has to be sent back.
+    """
+    with recording(file_timing):
+        return function(*args), file_timing
@@ -0,0 +1,35 @@
+from typing import cast
+
+from pdf_reader.custom_dataclasses import PdfParagraph
+
+from components.models import Statement
+from document_consumer.registry import StatementParser, register
+
+UOB = 'UOB'
+
+UOB_STATEMENT_TITLES = {
+    'Statement of Account': Statement.InstrumentType.ACCOUNT,
+    'Credit Card(s) Statement': Statement.InstrumentType.CARD
+}
+
+
+def detect_uob_text(file_name, first_page_text: str):
+    if 'United Overseas Bank Limited' not in first_page_text:
+        return None
+    # The title is at the top of the page, the other title can still turn up further down, e.g. in a card offer on an
+    # account statement
+    positions = {title: first_page_text.find(title) for title in UOB_STATEMENT_TITLES}
+    found = [title for title, position in positions.items() if position >= 0]
+    if not found:
+        return None
+    return UOB_STATEMENT_TITLES[min(found, key=positions.get)]
+
+
+def detect_uob_pages(pages):
+    if not pages[0].elements[-1].get_text().startswith('United Overseas Bank Limited'):
+        return None
+    return UOB_STATEMENT_TITLES.get(cast(PdfParagraph, pages[0].paragraphs[2]).elements[0].get_text())
+
+
+register(StatementParser(UOB, 'document_consumer.uob.factory.parse_extracted_uob_statement',
+                         pdf_text=detect_uob_text, pdf_pages=detect_uob_pages))
@@ -1,12 +1,8 @@
 import datetime
-import decimal
-import logging
 import re
-import sys
 from decimal import Decimal
 from typing import List, cast
 
-from django.contrib.contenttypes.models import ContentType
 from pdf_reader.custom_dataclasses import ExtractedPage, \
     PdfParagraph, \
     BaseElementGroup, \
@@ -20,24 +16,31 @@ from components.models import FinancialInstitution, \
     Statement, \
     InstrumentStatement, \
     CardSnapshot, CardTransaction
+from document_consumer.layout import RowClusters, ColumnLayout, Column, date_value, text_value
+from document_consumer.persistence import TransactionBuffer
+from document_consumer.resolver import resolver
+from document_consumer.timing import span
+
+# Lines whose y0 differ by at most this much belong to the same card summary or transaction row
+CARD_SUMMARY_ROW_TOLERANCE = 12
+CARD_TRANSACTION_ROW_TOLERANCE = 10
 
 
 def parse_uob_card_statement(file_name: str, pages: List[ExtractedPage], fi: FinancialInstitution):
-    statement_date = parse_uob_card_statement_month(pages[-1])
-    card_content_type = ContentType.objects.get_for_model(Card)
-    card_snapshots, summary_end_index, statement, currency, total_credit_limit = parse_uob_card_metadata(
-        file_name,
-        statement_date,
-        pages[0],
-        fi,
-        card_content_type)
-    card_transactions = parse_uob_card_transactions(pages[:-2],
-                                                    card_snapshots,
-                                                    summary_end_index,
-                                                    statement,
-                                                    currency,
-                                                    card_content_type,
-                                                    total_credit_limit)
+    with span('metadata'):
+        statement_date = parse_uob_card_statement_month(pages[-1])
+        card_snapshots, summary_end_index, statement, currency, total_credit_limit = parse_uob_card_metadata(
+            file_name,
+            statement_date,
+            pages[0],
+            fi)
+    with span('transactions'):
+        parse_uob_card_transactions(pages[:-2],
+                                    card_snapshots,
+                                    summary_end_index,
+                                    statement,
+                                    currency,
+                                    total_credit_limit)
 
 
 def parse_uob_card_statement_month(last_page: ExtractedPage):
@@ -50,8 +53,7 @@ def parse_uob_card_statement_month(last_page: ExtractedPage):
 def parse_uob_card_metadata(file_name: str,
                             statement_date: datetime.date,
                             first_page: ExtractedPage,
-                            fi: FinancialInstitution,
-                            card_content_type: ContentType):
+                            fi: FinancialInstitution):
     first_page_second_paragraph = cast(PdfParagraph, first_page.paragraphs[1])
     # Instrument holder name
     instrument_holder_name = ' '.join(word.text.capitalize() for word in
@@ -60,9 +62,9 @@ def parse_uob_card_metadata(file_name: str,
     # Instrument holder address
     holder_address_text = ' '.join([row.get_text() for row in first_page_second_paragraph.elements[1:]])
     holder_address_text = ' '.join([words.capitalize() for words in holder_address_text.split(' ')])
-    holder_address, holder_address_created = Address.objects.get_or_create(full_address=holder_address_text)
-    holder, holder_created = InstrumentHolder.objects.get_or_create(full_name=instrument_holder_name,
-                                                                    address=holder_address)
+    holder_address, holder_address_created = resolver.get_or_create(Address, full_address=holder_address_text)
+    holder, holder_created = resolver.get_or_create(InstrumentHolder, full_name=instrument_holder_name,
+                                                    address=holder_address)
 
     first_page_elements = first_page.elements
     # Statement day, statement year, currency and total credit limit
@@ -136,34 +138,28 @@ def parse_uob_card_metadata(file_name: str,
         i += 1
 
     # Group card details that spread across multiple lines
-    last_y_coor = sys.maxsize
-    last_card_dict = None
-    grouped_card_details = []
+    card_rows = RowClusters(CARD_SUMMARY_ROW_TOLERANCE)
     for y_coor, card_dict in cards_by_y_coor.items():
-        if last_y_coor - y_coor < 12:
-            for key, value in last_card_dict.items():
-                if key in card_dict:
-                    last_card_dict[key] += ' ' + card_dict[key]
-        else:
-            if last_card_dict is not None:
-                grouped_card_details.append(last_card_dict)
-            else:
-                grouped_card_details.append(card_dict)
-            last_card_dict = card_dict
-        last_y_coor = y_coor
+        card_rows.add(y_coor, card_dict)
+    grouped_card_details = []
+    for card_lines in card_rows.flat_rows():
+        card_dict = card_lines[0]
+        for line_dict in card_lines[1:]:
+            for key in card_dict:
+                if key in line_dict:
+                    card_dict[key] += ' ' + line_dict[key]
+        grouped_card_details.append(card_dict)
 
     # Persist card details
     for card_detail in grouped_card_details:
-        card, card_created = Card.objects.get_or_create(holder=holder,
-                                                        provider=fi,
-                                                        name=card_detail['name'],
-                                                        name_on_card=card_detail['holder'],
-                                                        number=card_detail['number'],
-                                                        currency=currency)
+        card, card_created = resolver.get_or_create(Card, holder=holder,
+                                                    provider=fi,
+                                                    name=card_detail['name'],
+                                                    name_on_card=card_detail['holder'],
+                                                    number=card_detail['number'],
+                                                    currency=currency)
         card_statement, card_statement_created = (InstrumentStatement.objects
-                                                  .get_or_create(instrument_content_type=card_content_type,
-                                                                 instrument_id=card.id,
-                                                                 statement=statement))
+                                                  .get_or_create(card=card, statement=statement))
         card_snapshot, card_snapshot_created = (CardSnapshot.objects
                                                 .get_or_create(instrument_statement=card_statement,
                                                                defaults={
@@ -180,44 +176,25 @@ def parse_uob_card_transactions(pages: List[ExtractedPage],
                                 summary_end_index: int,
                                 statement: Statement,
                                 currency: str,
-                                card_content_type: ContentType,
                                 total_credit_limit: Decimal):
     card_with_transactions = {}
     latest_card_snapshot = None
     found_end_of_transactions = False
-    card_snapshot_content_type = ContentType.objects.get_for_model(CardSnapshot)
     card_transaction_header_pattern = '^(\\d{4}-\\d{4}-\\d{4}-\\d{4}) ([\\w\\s]+).*$'
+    # Values on the 'Date'/'SGD' line under the headers are part of the header
+    transaction_layout = ColumnLayout([
+        Column('Post', date_value('post_date', statement.date.year), tolerance=2),
+        Column('Trans', date_value('date', statement.date.year), tolerance=2),
+        Column('Description of Transaction', text_value('description'), tolerance=0),
+        Column('Transaction Amount', parse_credit_card_amount, alignment='x1', open_right=True)
+    ], sub_header_offset=8)
 
     for i, page in enumerate(pages):
         elements = page.elements
         transaction_tables = {}
         latest_transaction_rows = {}
         elements_index = summary_end_index + 1 if i == 0 else 0
-        post_x_coor = None
-        trans_x_coor = None
-        date_currency_y_coor = None
-        description_x_coor = None
-        amount_x_start_coor = None
-        amount_x_end_coor = None
-
-        def parse_element_into_field(inner_group: BaseElementGroup):
-            if (post_x_coor is not None and
-                    abs(inner_group.x0 - post_x_coor) <= 2 < abs(inner_group.y0 - date_currency_y_coor)):
-                # Post date
-                extract_date(inner_group, latest_transaction_rows, statement.date.year, 'post_date')
-            elif (trans_x_coor is not None and
-                  abs(inner_group.x0 - trans_x_coor) <= 2 < abs(inner_group.y0 - date_currency_y_coor)):
-                # Transaction date
-                extract_date(inner_group, latest_transaction_rows, statement.date.year, 'date')
-            elif description_x_coor is not None and inner_group.x0 == description_x_coor:
-                # Description
-                extract_description(inner_group, latest_transaction_rows)
-            elif (amount_x_start_coor is not None and
-                  amount_x_end_coor is not None and
-                  inner_group.x1 >= amount_x_end_coor and
-                  abs(inner_group.y0 - date_currency_y_coor) > 2):
-                # Amount
-                extract_credit_card_amount(inner_group, latest_transaction_rows)
+        transaction_layout.reset()
 
         # Find transaction tables
         while elements_index < len(elements) and not found_end_of_transactions:
@@ -239,22 +216,20 @@ def parse_uob_card_transactions(pages: List[ExtractedPage],
 
                     parent_card = None
                     if latest_card_snapshot is not None:
-                        latest_card = latest_card_snapshot.instrument_statement.instrument
+                        latest_card = latest_card_snapshot.instrument_statement.card
                         parent_card = latest_card if latest_card.name == card_name else None
 
-                    card, card_created = Card.objects.get_or_create(holder=statement.holder,
-                                                                    provider=statement.provider,
-                                                                    name=card_name,
-                                                                    number=card_number,
-                                                                    name_on_card=name_on_card,
-                                                                    currency=currency,
-                                                                    defaults={
-                                                                        'parent': parent_card
-                                                                    })
+                    card, card_created = resolver.get_or_create(Card, holder=statement.holder,
+                                                                provider=statement.provider,
+                                                                name=card_name,
+                                                                number=card_number,
+                                                                name_on_card=name_on_card,
+                                                                currency=currency,
+                                                                defaults={
+                                                                    'parent': parent_card
+                                                                })
                     card_statement, card_statement_created = (InstrumentStatement.objects
-                                                              .get_or_create(instrument_content_type=card_content_type,
-                                                                             instrument_id=card.id,
-                                                                             statement=statement))
+                                                              .get_or_create(card=card, statement=statement))
                     card_snapshot, card_snapshot_created = (CardSnapshot.objects
                                                             .get_or_create(instrument_statement=card_statement,
                                                                            defaults={
@@ -268,107 +243,72 @@ def parse_uob_card_transactions(pages: List[ExtractedPage],
                 transaction_tables[latest_card_snapshot] = {}
                 latest_transaction_rows = transaction_tables[latest_card_snapshot]
 
-            elif element.get_text() == 'Post':
-                post_x_coor = element.x0
-                date_currency_y_coor = element.y0 - 8
-            elif element.get_text() == 'Trans':
-                trans_x_coor = element.x0
-                date_currency_y_coor = element.y0 - 8
-            elif element.get_text() == 'Description of Transaction':
-                description_x_coor = element.x0
-            elif element.get_text() == 'Transaction Amount':
-                amount_x_start_coor = element.x0
-                amount_x_end_coor = element.x1
+            elif transaction_layout.match_header(element.get_text(), element):
+                # Column positions for the rest of the page
+                pass
             elif type(element) is ExtractedPdfElement:
-                parse_element_into_field(cast(BaseElementGroup, element.el))
+                add_fields_to_rows(transaction_layout, cast(BaseElementGroup, element.el), latest_transaction_rows)
             elif type(element) is ExtractedTable:
                 # Description + transaction amount table
                 description_items = cast(ExtractedTable, element).items
                 for item in description_items:
                     for group in item.base_element_groups:
-                        parse_element_into_field(group)
+                        add_fields_to_rows(transaction_layout, group, latest_transaction_rows)
 
                     for value in item.values:
                         if value.el is not None:
-                            parse_element_into_field(value.el)
+                            add_fields_to_rows(transaction_layout, value.el, latest_transaction_rows)
 
             elements_index += 1
 
         # Create transactions for one table
         for snapshot, table_rows in transaction_tables.items():
             transactions_on_card = card_with_transactions[snapshot]
-            # Sort via descending y value (top of page to bottom)
-            table_rows = dict(sorted(table_rows.items(), key=lambda el: el[0], reverse=True))
-            last_y_coor = None
-            last_transaction = None
+            row_clusters = RowClusters(CARD_TRANSACTION_ROW_TOLERANCE)
             for y_coor, transaction_dict in table_rows.items():
-                if last_y_coor is not None and last_y_coor - y_coor <= 10:
+                row_clusters.add(y_coor, transaction_dict)
+
+            # Rows come out top of page to bottom
+            for transaction_lines in row_clusters.flat_rows():
+                transaction = transaction_lines[0]
+                for transaction_dict in transaction_lines[1:]:
                     # Merge rows that did not get parsed into the same logical row
                     if 'description' in transaction_dict:
-                        if 'sub_description' not in last_transaction:
-                            last_transaction['sub_description'] = []
-                        last_transaction['sub_description'].append(transaction_dict.pop('description'))
-                    last_transaction = last_transaction | transaction_dict
-                else:
-                    # Save previous transaction
-                    if last_transaction is not None:
-                        last_transaction['row_number'] = len(transactions_on_card) + 1
-                        transactions_on_card.append(last_transaction)
-                    # Beginning of a new transaction
-                    last_transaction = transaction_dict
+                        if 'sub_description' not in transaction:
+                            transaction['sub_description'] = []
+                        transaction['sub_description'].append(transaction_dict.pop('description'))
+                    transaction = transaction | transaction_dict
 
-                last_y_coor = y_coor
+                transaction['row_number'] = len(transactions_on_card) + 1
+                transactions_on_card.append(transaction)
 
-            # Save last transaction
-            last_transaction['row_number'] = len(transactions_on_card) + 1
-            transactions_on_card.append(last_transaction)
+        if found_end_of_transactions:
+            break
 
-    # Persist each transaction
-    snapshot_to_transactions = {}
+    # Persist transactions with one batch per card
+    transaction_buffer = TransactionBuffer(CardTransaction)
     for snapshot, transactions_list in card_with_transactions.items():
-        snapshot_to_transactions[snapshot] = []
         for transaction_dict in transactions_list:
-            if 'sub_description' in transaction_dict:
-                transaction_dict['sub_description'] = '\n'.join(transaction_dict['sub_description'])
-            transaction, transaction_created = (CardTransaction.objects
-                                                .get_or_create(snapshot_content_type=card_snapshot_content_type,
-                                                               snapshot_id=snapshot.id,
-                                                               row_number=transaction_dict.pop('row_number'),
-                                                               defaults=transaction_dict))
-
-            snapshot_to_transactions[snapshot].append(transaction)
+            transaction_buffer.add(snapshot, transaction_dict, row_number=transaction_dict.pop('row_number'))
 
-    return snapshot_to_transactions
+    return transaction_buffer.flush()
 
 
-def extract_date(group: BaseElementGroup, rows: dict, year: int, key: str):
-    try:
-        date = datetime.datetime.strptime(f'{group.text} {year}', '%d %b %Y')
-    except ValueError:
-        logging.debug(f'String \'{group.text}\' is not a date value.')
-        return
-    prepare_card_dict(rows, group.y0, key, date)
-
-
-def extract_description(group: BaseElementGroup, rows: dict):
-    prepare_card_dict(rows, group.y0, 'description', group.text)
-
-
-def extract_credit_card_amount(group: BaseElementGroup, rows: dict):
+def parse_credit_card_amount(group: BaseElementGroup):
     elements = group.elements
     if len(group.elements) > 2:
-        return
+        return None
     group.elements.sort(key=lambda e: e.x0)
     if len(elements) == 2 and elements[1].text == 'CR':
         key = 'cash_rebate'
     else:
         key = 'amount'
-    try:
-        amount = Decimal(elements[0].text.replace(',', ''))
-    except decimal.InvalidOperation:
-        logging.debug(f'String {elements[0].text} is not a numeric value.')
-        return
-    prepare_card_dict(rows, group.y0, key, amount)
+    return {key: Decimal(elements[0].text.replace(',', ''))}
+
+
+def add_fields_to_rows(layout: ColumnLayout, group: BaseElementGroup, rows: dict):
+    for key, value in layout.parse(group).items():
+        prepare_card_dict(rows, group.y0, key, value)
 
 
 # Helper method for preparing table rows
@@ -1,27 +1,41 @@
-from typing import List, cast
+from pathlib import Path
+from typing import List
 
-from pdf_reader.custom_dataclasses import ExtractedPage, PdfParagraph
+from pdf_reader.custom_dataclasses import ExtractedPage
 
-from components.models import Address, FinancialInstitution
+from components.models import Address, FinancialInstitution, InstrumentHolder, Statement
 from document_consumer.uob.account_parser import parse_uob_account_statement
 from document_consumer.uob.card_parser import parse_uob_card_statement
+from document_consumer.resolver import resolver
+from document_consumer.timing import span
 
 
-def parse_uob_statement(file_name, pages: List[ExtractedPage], fi_information):
-    fi_address, fi_address_created = Address.objects.get_or_create(full_address=fi_information[1])
+def parse_uob_statement(file_name,
+                        pages: List[ExtractedPage],
+                        fi_information: List[str],
+                        statement_type: Statement.InstrumentType):
+    with span('institution'):
+        fi_address, fi_address_created = resolver.get_or_create(Address, full_address=fi_information[1])
 
-    company_registration_number = fi_information[2].replace('Co. Reg. No. ', '')
-    gst_registration_number = fi_information[3].replace('GST Reg. No. ', '')
-    fi, fi_created = FinancialInstitution.objects.get_or_create(full_name=fi_information[0],
-                                                                abbreviation='UOB',
-                                                                address=fi_address,
-                                                                company_registration_number=company_registration_number,
-                                                                gst_registration_number=gst_registration_number,
-                                                                website=fi_information[4])
+        company_registration_number = fi_information[2].replace('Co. Reg. No. ', '')
+        gst_registration_number = fi_information[3].replace('GST Reg. No. ', '')
+        fi, fi_created = resolver.get_or_create(FinancialInstitution, full_name=fi_information[0],
+                                                abbreviation='UOB',
+                                                address=fi_address,
+                                                company_registration_number=company_registration_number,
+                                                gst_registration_number=gst_registration_number,
+                                                website=fi_information[4])
 
-    first_page_second_paragraph_first_element_text = cast(PdfParagraph, pages[0].paragraphs[2]).elements[0].get_text()
-    match first_page_second_paragraph_first_element_text:
-        case 'Statement of Account':
+    match statement_type:
+        case Statement.InstrumentType.ACCOUNT:
             parse_uob_account_statement(file_name, pages, fi)
-        case 'Credit Card(s) Statement':
+        case Statement.InstrumentType.CARD:
             parse_uob_card_statement(file_name, pages, fi)
+
+
+def parse_extracted_uob_statement(file_name,
+                                  pages: List[ExtractedPage],
+                                  statement_type: Statement.InstrumentType,
+                                  holder: InstrumentHolder = None):
+    fi_information = pages[0].elements[-1].get_text().split(' • ')
+    parse_uob_statement(Path(file_name).stem, pages, fi_information, statement_type)
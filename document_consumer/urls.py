@@ -0,0 +1,10 @@
+from django.urls import path
+
+from document_consumer import views
+
+app_name = 'document_consumer'
+
+urlpatterns = [
+    path('upload/', views.upload_statements, name='upload'),
+    path('jobs/<int:job_id>/', views.job_status, name='job_status'),
+]
@@ -1,3 +1,80 @@
-from django.shortcuts import render
+import uuid
+from pathlib import Path
 
-# Create your views here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET, require_POST
+
+from components.models import InstrumentHolder
+from document_consumer.jobs import enqueue_job, start_background_runner
+from document_consumer.models import IngestionJob
+from document_consumer.services import SUPPORTED_EXTENSIONS
+
+
+@require_POST
+async def upload_statements(request):
+    """
+    Accept one or more statement files under the 'files' field and queue each for ingestion. The optional 'holder'
+    field is the id of the instrument holder of statements that do not name theirs, such as CSV exports. Responds with
+    the job ids straight away; progress is polled from job_status.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+
+    files = await sync_to_async(request.FILES.getlist)('files')
+    if not files:
+        return JsonResponse({'error': 'No files uploaded'}, status=400)
+    unsupported = [file.name for file in files if Path(file.name).suffix.casefold() not in SUPPORTED_EXTENSIONS]
+    if unsupported:
+        return JsonResponse({'error': 'Unsupported file type', 'files': unsupported}, status=400)
+    holder = None
+    if holder_id := await sync_to_async(request.POST.get)('holder'):
+        holder = await InstrumentHolder.objects.filter(pk=holder_id).afirst() if holder_id.isdigit() else None
+        if holder is None:
+            return JsonResponse({'error': 'Unknown instrument holder'}, status=400)
+
+    jobs = []
+    for file in files:
+        file_name = await sync_to_async(save_upload)(file)
+        job = await sync_to_async(enqueue_job)(file_name, holder=holder)
+        jobs.append({'id': job.pk, 'file': file.name})
+    if settings.INGESTION_RUN_IN_SERVER:
+        start_background_runner()
+    return JsonResponse({'jobs': jobs}, status=202)
+
+
+@require_GET
+async def job_status(request, job_id):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+
+    job = await IngestionJob.objects.filter(pk=job_id).afirst()
+    if job is None:
+        return JsonResponse({'error': 'Job not found'}, status=404)
+    return JsonResponse({
+        'id': job.pk,
+        'file': Path(job.file_path).name,
+        'state': job.state,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        # Only the exception line, the traceback stays in the job table
+        'error': job.error.strip().splitlines()[-1] if job.error else None,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'next_attempt_at': job.available_at if job.state == IngestionJob.State.QUEUED else None,
+        'finished_at': job.finished_at
+    })
+
+
+def save_upload(file):
+    # The file stem becomes the statement's file name, so each upload keeps its own name in its own directory
+    directory = Path(settings.UPLOAD_DIR) / uuid.uuid4().hex
+    directory.mkdir(parents=True)
+    file_name = directory / Path(file.name).name
+    with open(file_name, 'wb') as destination:
+        for chunk in file.chunks():
+            destination.write(chunk)
+    return file_name
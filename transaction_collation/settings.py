@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -82,6 +83,17 @@ DATABASES = {
     }
 }
 
+# Applied to every new SQLite connection by document_consumer.signals
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    # With WAL, a power loss can only drop the latest commits, it cannot corrupt the database
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 ** 2,
+    # Negative sizes are in KiB
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY'
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -123,3 +135,59 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Document consumer
+
+# Extracted PDF pages are cached here so re-ingestion and parser fixes skip layout analysis and OCR
+EXTRACTION_CACHE_DIR = BASE_DIR / 'cache' / 'extracted_pages'
+EXTRACTION_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# Tesseract binary used for scanned statements, e.g. C:\\Program Files\\Tesseract-OCR\\tesseract.exe on Windows
+TESSERACT_CMD = os.environ.get('TESSERACT_CMD', 'tesseract')
+# OCR output per page image, so pages are not OCRed again when a statement is re-extracted
+OCR_CACHE_DIR = BASE_DIR / 'cache' / 'ocr'
+OCR_CACHE_MAX_BYTES = 256 * 1024 ** 2
+
+# Bank packages that register how their statements are detected and parsed, see document_consumer.registry
+STATEMENT_PARSER_PACKAGES = [
+    'document_consumer.ocbc',
+    'document_consumer.uob',
+    'document_consumer.posb',
+]
+
+# Statements uploaded over HTTP are stored here and ingested in the background
+UPLOAD_DIR = BASE_DIR / 'uploads'
+
+# Ingestion jobs, see document_consumer.jobs
+INGESTION_WORKERS = os.cpu_count()
+INGESTION_MAX_ATTEMPTS = 3
+# Seconds before the first retry, doubled for every further attempt
+INGESTION_RETRY_DELAY = 30
+# Seconds after which a claimed job whose runner went away, and so stopped refreshing its claim, is released
+INGESTION_JOB_TIMEOUT = 60 * 60
+# Run jobs in a thread of the web server; disable when a process_ingestion_jobs worker is running instead
+INGESTION_RUN_IN_SERVER = True
+# Log per stage timings of every statement, see document_consumer.timing
+INGESTION_TIMING = False
+# Most queries and seconds of database time ({'queries': ..., 'seconds': ...}) one statement may take to persist,
+# None for no budget. A statement over budget is logged with its queries per model ('warn') or rolled back ('fail')
+INGESTION_QUERY_BUDGET = None
+INGESTION_QUERY_BUDGET_ACTION = 'warn'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler'
+        }
+    },
+    'loggers': {
+        # Only logs while ingestion timing is on
+        'document_consumer.timing': {
+            'handlers': ['console'],
+            'level': 'INFO'
+        }
+    }
+}